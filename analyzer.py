@@ -1,27 +1,330 @@
 """
 This module provides the FollowerInsights class for analyzing follower and following data.
+Usernames are interned once into integer ids and list membership is kept in bitsets,
+so hater, ghost and mutual queries are bitwise operations on whole lists.
+When the lists are reloaded only the users whose membership changed are reclassified,
+and results are cached until the data changes.
 """
 
+import heapq
+import re
+from typing import Callable, Iterable, Iterator, NamedTuple, TypeVar
+
+T = TypeVar("T")
+
+
+class UsernameIndex:
+    """
+    Interns usernames into consecutive integer ids.
+    """
+
+    def __init__(self):
+        self.ids: dict[str, int] = {}
+        self.names: list[str] = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        """Return the id of a username, assigning a new one if it's unknown."""
+        user_id = self.ids.get(name)
+        if user_id is None:
+            user_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return user_id
+
+    def lookup(self, user_ids: Iterable[int]) -> list[str]:
+        """Return the usernames of the given ids."""
+        names = self.names
+        return [names[user_id] for user_id in user_ids]
+
+
+class Bitset:
+    """
+    A set of small non-negative integers, one bit per integer.
+    """
+
+    __slots__ = ("bits",)
+
+    def __init__(self):
+        self.bits = bytearray()
+
+    @classmethod
+    def from_ids(cls, user_ids: Iterable[int]) -> "Bitset":
+        """Build a bitset holding the given ids."""
+        bitset = cls()
+        for user_id in user_ids:
+            bitset.add(user_id)
+        return bitset
+
+    def __contains__(self, user_id: int) -> bool:
+        byte = user_id >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] >> (user_id & 7) & 1)
+
+    def __len__(self):
+        return self.mask().bit_count()
+
+    def add(self, user_id: int):
+        """Add an id to the set."""
+        byte = user_id >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte - len(self.bits) + 1))
+        self.bits[byte] |= 1 << (user_id & 7)
+
+    def discard(self, user_id: int):
+        """Remove an id from the set if it is present."""
+        byte = user_id >> 3
+        if byte < len(self.bits):
+            self.bits[byte] &= ~(1 << (user_id & 7)) & 0xFF
+
+    def mask(self) -> int:
+        """Return the set as an integer, bit N is set if id N is in the set."""
+        return int.from_bytes(self.bits, "little")
+
+
+# Turns the "0"/"1" characters of a binary string into 0/1 bytes.
+_BIT_TO_BYTE = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def _bit_bytes(mask: int, size: int) -> bytes:
+    """Return one byte per id, 1 if the id is set in the mask and 0 otherwise."""
+    bits = bin(mask)[:1:-1].encode() if mask else b""
+    return bits.translate(_BIT_TO_BYTE).ljust(size, b"\x00")
+
+
+def iter_ids(mask: int) -> Iterator[int]:
+    """
+    Iterates over the ids set in an integer mask, in ascending order.
+
+    Args:
+        mask (int): The mask, bit N is set if id N is in the set.
+
+    Returns:
+        Iterator[int]: The ids.
+    """
+    # The reversed binary string has the bit of id N at position N
+    bits = bin(mask)[:1:-1]
+    user_id = bits.find("1")
+    while user_id != -1:
+        yield user_id
+        user_id = bits.find("1", user_id + 1)
+
+
+class InsightRecord(NamedTuple):
+    """
+    The insights on a single user.
+
+    Attributes:
+        username (str): The username.
+        is_hater (bool): I follow them, they don't follow me.
+        is_ghost (bool): They follow me, I don't follow them.
+    """
+
+    username: str
+    is_hater: bool
+    is_ghost: bool
+
+    @property
+    def is_friend(self) -> bool:
+        """We follow each other."""
+        return not self.is_hater and not self.is_ghost
+
+
+class InsightRecords:
+    """
+    The insights on all users as two parallel columns: the usernames and one flag
+    byte per user telling which lists the user is in. Users in neither list have
+    no flags and are skipped.
+    """
+
+    __slots__ = ("names", "flags")
+
+    FOLLOWER = 1
+    FOLLOWING = 2
+
+    # The flag values of the users of every category.
+    CATEGORIES = {
+        "all": (FOLLOWER, FOLLOWING, FOLLOWER | FOLLOWING),
+        "haters": (FOLLOWING,),
+        "ghosts": (FOLLOWER,),
+        "mutuals": (FOLLOWER | FOLLOWING,),
+    }
+
+    def __init__(self, names: list[str], flags: bytes):
+        # `names` may be longer than `flags`, users interned later are not part of the records
+        self.names = names
+        self.flags = flags
+
+    @classmethod
+    def from_sorted(
+        cls, followers: Iterable[str], followings: Iterable[str]
+    ) -> "InsightRecords":
+        """
+        Builds the records of two lists that iterate in username order with a
+        single merge, without interning the names first.
+
+        Args:
+            followers (Iterable[str]): The sorted followers.
+            followings (Iterable[str]): The sorted followings.
+
+        Returns:
+            InsightRecords: A record for every follower and following, in username order.
+        """
+        names, flags = [], bytearray()
+        for name, flag in heapq.merge(
+            ((name, cls.FOLLOWER) for name in followers),
+            ((name, cls.FOLLOWING) for name in followings),
+        ):
+            if names and names[-1] == name:
+                flags[-1] |= flag
+            else:
+                names.append(name)
+                flags.append(flag)
+
+        return cls(names, bytes(flags))
+
+    def __len__(self):
+        return len(self.flags) - self.flags.count(0)
+
+    def __iter__(self) -> Iterator[InsightRecord]:
+        return self.filter("all")
+
+    def count(self, *categories: str) -> int:
+        """
+        Counts the users of the given categories.
+
+        Args:
+            *categories (str): Any of "all", "haters", "ghosts" or "mutuals".
+
+        Returns:
+            int: The number of users.
+        """
+        return sum(self.flags.count(flag) for flag in self._flags_of(categories))
+
+    def filter(self, *categories: str) -> Iterator[InsightRecord]:
+        """
+        Iterates over the users of the given categories.
+
+        Args:
+            *categories (str): Any of "all", "haters", "ghosts" or "mutuals".
+
+        Returns:
+            Iterator[InsightRecord]: The records of the matching users.
+        """
+        return map(self.record, self.positions(*categories))
+
+    def positions(self, *categories: str) -> Iterator[int]:
+        """
+        Iterates over the positions of the users of the given categories.
+
+        Args:
+            *categories (str): Any of "all", "haters", "ghosts" or "mutuals".
+
+        Returns:
+            Iterator[int]: The positions, usable with `record`.
+        """
+        wanted = bytes(sorted(self._flags_of(categories)))
+        if not wanted:
+            return iter(())
+
+        pattern = re.compile(b"[" + re.escape(wanted) + b"]")
+        return (match.start() for match in pattern.finditer(self.flags))
+
+    def record(self, position: int) -> InsightRecord:
+        """
+        Returns the record of the user at a position.
+
+        Args:
+            position (int): The position of the user.
+
+        Returns:
+            InsightRecord: The record of the user.
+        """
+        flag = self.flags[position]
+        return InsightRecord(
+            username=self.names[position],
+            is_hater=flag == self.FOLLOWING,
+            is_ghost=flag == self.FOLLOWER,
+        )
+
+    def _flags_of(self, categories: Iterable[str]) -> set[int]:
+        """Return the flag values of the users of the given categories."""
+        return {flag for category in categories for flag in self.CATEGORIES[category]}
+
 
 class FollowerInsights:
     """
     A class for analyzing Instagram followers and followings.
+
+    Attributes:
+        index (UsernameIndex): Maps usernames to the ids used in the bitsets.
+        followers (Bitset): The ids of the followers.
+        followings (Bitset): The ids of the followings.
+        haters (Bitset): The ids of users I follow who don't follow me.
+        ghosts (Bitset): The ids of users who follow me whom I don't follow.
+        mutuals (Bitset): The ids of users who follow me and whom I follow.
+        version (int): Incremented on every change, cached results of an older
+            version are recomputed.
     """
 
     def __init__(self):
-        self.followers = set()
-        self.followings = set()
+        self.index = UsernameIndex()
+        self.followers = Bitset()
+        self.followings = Bitset()
+        self.haters = Bitset()
+        self.ghosts = Bitset()
+        self.mutuals = Bitset()
+        self.version = 0
+        self._memo: dict[str, tuple[int, object]] = {}
 
     def load(self, new_followers_list: list[str], new_followings_list: list[str]):
         """
-        Loads new follower and following data.
+        Loads new follower and following data. Only the users whose membership
+        changed since the previous load are reclassified.
 
         Args:
             new_followers_list (list[str]): A list of new followers.
             new_followings_list (list[str]): A list of new followings.
         """
-        self.followers = set(new_followers_list)
-        self.followings = set(new_followings_list)
+        intern = self.index.intern
+        followers = Bitset.from_ids(intern(name) for name in new_followers_list)
+        followings = Bitset.from_ids(intern(name) for name in new_followings_list)
+
+        changed = (self.followers.mask() ^ followers.mask()) | (
+            self.followings.mask() ^ followings.mask()
+        )
+        if not changed:
+            return
+
+        self.followers, self.followings = followers, followings
+        for user_id in iter_ids(changed):
+            self._classify(user_id)
+        self.version += 1
+
+    def _classify(self, user_id: int):
+        """Update the hater, ghost and mutual bitsets of a single user."""
+        is_follower = user_id in self.followers
+        is_following = user_id in self.followings
+
+        for bitset, member in (
+            (self.haters, is_following and not is_follower),
+            (self.ghosts, is_follower and not is_following),
+            (self.mutuals, is_follower and is_following),
+        ):
+            if member:
+                bitset.add(user_id)
+            else:
+                bitset.discard(user_id)
+
+    def _memoize(self, key: str, compute: Callable[[], T]) -> T:
+        """Return the cached result of `compute`, unless the data changed since."""
+        cached = self._memo.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+
+        result = compute()
+        self._memo[key] = (self.version, result)
+        return result
 
     def get_all_followers(self) -> list[str]:
         """
@@ -30,7 +333,7 @@ class FollowerInsights:
         Returns:
             list[str]: A list of all followers.
         """
-        return list(self.followers)
+        return self._memoize("followers", lambda: self._names(self.followers.mask()))
 
     def get_haters_list(self) -> list[str]:
         """
@@ -39,7 +342,7 @@ class FollowerInsights:
         Returns:
             list[str]: A list of users who don't follow back.
         """
-        return list(self.followings - self.followers)
+        return self._memoize("haters", lambda: self._names(self.haters.mask()))
 
     def get_ghosts_list(self) -> list[str]:
         """
@@ -48,48 +351,51 @@ class FollowerInsights:
         Returns:
             list[str]: A list of users who follow but are not followed back.
         """
-        return list(self.followers - self.followings)
+        return self._memoize("ghosts", lambda: self._names(self.ghosts.mask()))
 
-    def get_full_insights(self) -> dict[str, dict[str, bool]]:
+    def get_mutuals_list(self) -> list[str]:
         """
-        Returns a dictionary with full insights on followers and followings.
+        Returns a list of users who follow and are followed back.
 
         Returns:
-            dict[str, dict[str, bool]]: A dictionary with full insights.
+            list[str]: A list of users who follow and are followed back.
         """
-        insights = {}
+        return self._memoize("mutuals", lambda: self._names(self.mutuals.mask()))
 
-        for name in self.followers:
-            if name not in insights:
-                insights[name] = self._create_empty_stat_record()
+    def get_full_insights(self) -> "InsightRecords":
+        """
+        Returns the full insights on followers and followings.
+        The result is cached until the data changes.
 
-            # They are in my followers list but not in my followings = I don't follow them
-            insights[name]["is_ghost"] = name not in self.followings
+        Returns:
+            InsightRecords: A record for every follower and following.
+        """
+        return self._memoize("full", self._build_full_insights)
 
-        for name in self.followings:
-            if name not in insights:
-                insights[name] = self._create_empty_stat_record()
+    def _build_full_insights(self) -> "InsightRecords":
+        """Build the full insights by packing both lists into one flag byte per user."""
+        size = len(self.index)
+        followers = int.from_bytes(_bit_bytes(self.followers.mask(), size), "little")
+        followings = int.from_bytes(_bit_bytes(self.followings.mask(), size), "little")
 
-            # They are not in my followers list = they don't follow me
-            insights[name]["is_hater"] = name not in self.followers
+        # Every byte is 0..3, so adding the two byte strings as integers never carries
+        flags = (
+            followers * InsightRecords.FOLLOWER + followings * InsightRecords.FOLLOWING
+        ).to_bytes(size, "little")
 
-        return insights
+        return InsightRecords(self.index.names, flags)
 
     def flush(self):
         """
         Empties internal lists of followers and followings
         """
-        self.followers = set()
-        self.followings = set()
-
-    def _create_empty_stat_record(self) -> dict[str, bool]:
-        """
-        Creates an empty statistics record.
+        self.followers = Bitset()
+        self.followings = Bitset()
+        self.haters = Bitset()
+        self.ghosts = Bitset()
+        self.mutuals = Bitset()
+        self.version += 1
 
-        Returns:
-            dict[str, bool]: An empty statistics record.
-        """
-        return {
-            "is_hater": False,  # I follow, they don't
-            "is_ghost": False,  # They follow, I don't
-        }
+    def _names(self, mask: int) -> list[str]:
+        """Return the usernames of the ids set in a mask."""
+        return self.index.lookup(iter_ids(mask))
@@ -0,0 +1,493 @@
+"""
+This module provides an asyncio-based scrape engine built on playwright.async_api.
+It runs the same steps as main.run_simplified: restore cookies, log in, open the
+profile and extract the lists, but page waits no longer block the whole process,
+so both lists (and several accounts) can be scraped at the same time.
+
+Usage from a script:
+
+    asyncio.run(async_engine.run(account, repo))
+"""
+
+import asyncio
+import time
+from typing import Callable, Optional
+
+from playwright.async_api import Browser, BrowserContext, Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright
+
+import auth
+import console
+import constants
+import model
+from browser import block_resources_async, launch_options
+from cache import FollowerCache
+from commands.extraction import ListExtractionState
+from commands.harvest import HARVEST_SCRIPT
+from commands.pacing import (
+    ROW_COUNT_GREW_SCRIPT,
+    SpeedProfile,
+    poll_intervals,
+    retry_delays,
+)
+from commands.profile import RESCROLL_SCRIPT, SCROLL_SCRIPT
+from metrics import ScrapeMetrics, export_run
+from scheduler import THROTTLE_SCRIPT, RequestScheduler, Throttled
+
+
+async def new_context(
+    browser: Browser, account: model.Account, lean=constants.LEAN_BROWSER
+) -> BrowserContext:
+    """
+    Creates a browser context restored from the stored session of the account.
+
+    Args:
+        browser (Browser): The Playwright browser.
+        account (model.Account): The account whose session is restored.
+        lean (bool): Block images, media, fonts and tracking in the context.
+
+    Returns:
+        BrowserContext: The new context.
+    """
+    context = await browser.new_context(storage_state=auth.get_storage_state(account))
+    if lean:
+        await block_resources_async(context)
+    return context
+
+
+async def store_session(context: BrowserContext, account: model.Account):
+    """
+    The asyncio counterpart of auth.store_session.
+
+    Args:
+        context (BrowserContext): The Playwright browser context.
+        account (model.Account): The account whose session is stored.
+    """
+    await context.storage_state(path=auth.session_file(account))
+
+
+async def manual_login(page: Page, account: model.Account, persist_session=True):
+    """
+    The asyncio counterpart of auth.manual_login.
+
+    Args:
+        page (Page): The Playwright page object.
+        account (model.Account): The account to log in with.
+        persist_session (bool): Whether to store the session after login.
+    """
+    auth.validate_auth_configs(account)
+
+    btn = page.get_by_text(auth.COOKIE_CONSENT_TEXT)
+    if await btn.count():
+        await btn.click()
+
+    await page.get_by_label(auth.USERNAME_LABEL).fill(account.email)
+    await page.get_by_label(auth.PASSWORD_LABEL).fill(account.password)
+    await page.locator(auth.SUBMIT_SELECTOR).click()
+
+    await page.wait_for_url(auth.LOGGED_IN_URL)
+    await page.wait_for_load_state("networkidle")
+
+    if persist_session:
+        await store_session(page.context, account)
+
+
+async def open_profile(
+    page: Page, account: model.Account, scheduler: Optional[RequestScheduler] = None
+):
+    """
+    Navigates to the profile page of the account, again after a while if
+    Instagram shows a throttling message.
+
+    Args:
+        page (Page): The Playwright page object.
+        account (model.Account): The account whose profile is opened.
+        scheduler (Optional[RequestScheduler]): Paces the navigations.
+
+    Raises:
+        Throttled: If Instagram keeps throttling the account.
+    """
+    scheduler = scheduler or RequestScheduler()
+
+    attempt = 0
+    while True:
+        await scheduler.pace_async()
+        await page.goto(f"{constants.IG_BASE_URL}/{account.username}/")
+        await page.wait_for_url(f"**/{account.username}/**")
+        if not await page.evaluate(THROTTLE_SCRIPT):
+            break
+
+        await scheduler.back_off_async(attempt)
+        attempt += 1
+
+    await page.locator("header ul [role=link]").first.wait_for()
+
+
+class AsyncScrollPacer:
+    """
+    The asyncio counterpart of commands.pacing.ScrollPacer, it follows the same
+    poll_intervals and retry_delays.
+    """
+
+    poll_interval = 50  # Milliseconds
+
+    def __init__(self, profile: SpeedProfile):
+        self.profile = profile
+
+    async def wait_for_rows(self, page: Page, consumed: int) -> bool:
+        """Waits until the dialog has more rows than were already consumed."""
+
+        async def rows_grew():
+            try:
+                await page.wait_for_function(
+                    ROW_COUNT_GREW_SCRIPT,
+                    arg=consumed,
+                    timeout=self.profile.settle_timeout,
+                    polling="raf",
+                )
+                return True
+            except PlaywrightTimeoutError:
+                return False
+
+        return await self._retry(rows_grew)
+
+    async def wait_until(self, condition: Callable[[], bool]) -> bool:
+        """Waits until a Python-side condition holds."""
+
+        async def condition_met():
+            for interval in poll_intervals(
+                self.profile.settle_timeout, self.poll_interval
+            ):
+                if condition():
+                    return True
+                await asyncio.sleep(interval / 1000)
+            return condition()
+
+        return await self._retry(condition_met)
+
+    async def _retry(self, attempt) -> bool:
+        """Run an attempt until it succeeds, backing off exponentially between tries."""
+        if await attempt():
+            return True
+        for delay in retry_delays(self.profile):
+            await asyncio.sleep(delay)
+            if await attempt():
+                return True
+        return False
+
+
+class AsyncListExtraction(ListExtractionState):
+    """
+    The asyncio counterpart of commands.profile.ListExtraction, only the page I/O
+    differs, the state of the extraction is kept by ListExtractionState.
+    Resuming from a checkpoint is not supported.
+    """
+
+    def __init__(
+        self,
+        page: Page,
+        repo: FollowerCache,
+        my_followers=True,
+        source=constants.SCRAPE_SOURCE,
+        speed_profile=constants.SPEED_PROFILE,
+        metrics: Optional[ScrapeMetrics] = None,
+        delta=constants.DELTA_SYNC,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
+        super().__init__(
+            repo,
+            my_followers,
+            source,
+            speed_profile,
+            metrics,
+            delta=delta,
+            scheduler=scheduler,
+        )
+        self.page = page
+        self.pacer = AsyncScrollPacer(self.speed_profile)
+
+    async def open(self):
+        """Reads the number of users from the profile header and opens the dialog."""
+        with self.metrics.phase(f"open_{self.list_name}_dialog"):
+            await self._open()
+
+    async def _open(self):
+        """Opens the dialog, see open."""
+        following_link = self.page.locator(self.header_link)
+        self.configure(await following_link.text_content())
+
+        # Must listen before the click, the first page is loaded right away
+        self.listener.attach_async(self.page)
+
+        await following_link.click()
+
+    async def step(self) -> bool:
+        """
+        Waits for the previous scroll to settle and adds the new names to the cache.
+
+        Returns:
+            bool: True if new names were added, False if the extraction is finished.
+        """
+        if not self.begin_cycle():
+            return False
+
+        start = time.perf_counter()
+        await self._wait_for_page()
+        settled = time.perf_counter()
+        names = await self._read_page()
+
+        # Back off and ask for the page again while Instagram throttles,
+        # meanwhile the other lists and accounts keep going
+        attempt = 0
+        while not names and await self.is_throttled():
+            with self.metrics.phase("throttle_backoff"):
+                await self.scheduler.back_off_async(attempt)
+            attempt += 1
+
+            start = time.perf_counter()
+            await self.scheduler.pace_async()
+            await self.page.evaluate(RESCROLL_SCRIPT)
+            await self._wait_for_page()
+            settled = time.perf_counter()
+            names = await self._read_page()
+
+        return self.take_names(names, start, settled)
+
+    async def _wait_for_page(self):
+        """Waits for the previous scroll to load the next page of results."""
+        if self.collector is not None:
+            await self.pacer.wait_until(self.collector.has_pending)
+        else:
+            await self.pacer.wait_for_rows(self.page, self.harvester.consumed)
+
+    async def _read_page(self) -> list[str]:
+        """Returns the names loaded since the previous cycle."""
+        if self.collector is not None:
+            return self.collector.drain()
+        return self.harvester.consume(
+            await self.page.evaluate(HARVEST_SCRIPT, self.harvester.consumed)
+        )
+
+    async def is_throttled(self) -> bool:
+        """Check if Instagram refused to load a page or shows a throttling message."""
+        if self.listener.take_throttled():
+            return True
+        return bool(await self.page.evaluate(THROTTLE_SCRIPT))
+
+    async def scroll(self):
+        """Scrolls the dialog to load the next page, unless the last one is loaded."""
+        if not self.should_scroll():
+            return
+
+        await self.scheduler.pace_async()
+        await self.page.evaluate(SCROLL_SCRIPT)
+
+    def close(self):
+        """Stops listening to the page."""
+        self.listener.detach(self.page)
+
+
+async def extract_followers(
+    page: Page,
+    repo: FollowerCache,
+    my_followers=True,
+    metrics: Optional[ScrapeMetrics] = None,
+    **kwargs,
+):
+    """
+    Extracts followers or followings from an Instagram profile and stores them in a cache.
+    Saving happens between awaits, so lists extracted concurrently into the same
+    cache never write it at the same time.
+
+    Args:
+        page (Page): The Playwright page object, on the profile page.
+        repo (FollowerCache): The cache object to store followers or followings.
+        my_followers (bool): If True, extracts followers; otherwise, extracts followings.
+        metrics (Optional[ScrapeMetrics]): Records the timing of every cycle.
+        **kwargs: `source`, `speed_profile`, `delta` and `scheduler`, see
+            AsyncListExtraction.
+
+    Raises:
+        Throttled: If Instagram keeps throttling, the names read so far are saved.
+    """
+    extraction = AsyncListExtraction(
+        page, repo, my_followers, metrics=metrics, **kwargs
+    )
+    await extraction.open()
+
+    try:
+        while await extraction.step():
+            extraction.save(repo)
+            await extraction.scroll()
+    finally:
+        extraction.close()
+
+    if extraction.reconcile():
+        repo.save()
+
+
+async def scrape_account(
+    context: BrowserContext,
+    account: model.Account,
+    repo: FollowerCache,
+    metrics: Optional[ScrapeMetrics] = None,
+    scheduler: Optional[RequestScheduler] = None,
+    **kwargs,
+) -> bool:
+    """
+    Collects followers and followings of the account into the cache, both lists
+    are extracted at the same time in two pages of the context.
+
+    Args:
+        context (BrowserContext): The browser context of the account, see new_context.
+        account (model.Account): The account to scrape.
+        repo (FollowerCache): The cache object of the account.
+        metrics (Optional[ScrapeMetrics]): Records the timing of every phase and cycle.
+        scheduler (Optional[RequestScheduler]): Paces the actions of the account,
+            each account of a batch gets its own.
+        **kwargs: `source`, `speed_profile` and `delta`, see AsyncListExtraction.
+
+    Returns:
+        bool: True if the lists were collected, False if Instagram kept throttling
+            the account. The names read so far are saved then.
+    """
+    metrics = metrics or ScrapeMetrics()
+    scheduler = scheduler or RequestScheduler()
+
+    try:
+        await _scrape_account(context, account, repo, metrics, scheduler, **kwargs)
+    except Throttled:
+        repo.save()
+        return False
+    return True
+
+
+async def _scrape_account(
+    context: BrowserContext,
+    account: model.Account,
+    repo: FollowerCache,
+    metrics: ScrapeMetrics,
+    scheduler: RequestScheduler,
+    **kwargs,
+):
+    """Runs the steps of scrape_account, raises Throttled if Instagram keeps throttling."""
+    # 1. The context was restored from the stored session, check if it still
+    # works and if Instagram blocks the bot
+    attempt = 0
+    while True:
+        with metrics.phase("probe"):
+            status = await auth.probe_session_async(context)
+        if status != auth.SessionStatus.RATE_LIMITED:
+            break
+
+        with metrics.phase("throttle_backoff"):
+            await scheduler.back_off_async(attempt)
+        attempt += 1
+
+    page = await context.new_page()
+
+    # 2. Fill the login form
+    if status == auth.SessionStatus.EXPIRED:
+        with metrics.phase("login"):
+            await scheduler.pace_async()
+            await page.goto(f"{constants.IG_BASE_URL}/")
+            await manual_login(page, account)
+
+    # 3. Go to Profile page, then open the second list in its own page
+    with metrics.phase("navigation"):
+        await open_profile(page, account, scheduler)
+
+        followings_page = await context.new_page()
+        await scheduler.pace_async()
+        await followings_page.goto(page.url)
+        await followings_page.locator("header ul [role=link]").first.wait_for()
+
+    # 4. Get all followers and followings, sharing the budget of the account
+    repo.begin_snapshot()
+    tasks = [
+        asyncio.ensure_future(
+            extract_followers(page, repo, True, metrics, scheduler=scheduler, **kwargs)
+        ),
+        asyncio.ensure_future(
+            extract_followers(
+                followings_page, repo, False, metrics, scheduler=scheduler, **kwargs
+            )
+        ),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except Throttled:
+        # Stop the other list too, it shares the throttled account
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    repo.save()
+
+    await followings_page.close()
+    await page.close()
+
+
+async def run(
+    account: model.Account,
+    repo: FollowerCache,
+    source=constants.SCRAPE_SOURCE,
+    speed_profile=constants.SPEED_PROFILE,
+    lean=constants.LEAN_BROWSER,
+    delta=constants.DELTA_SYNC,
+) -> bool:
+    """
+    Run the follower analysis tool on the async engine.
+
+    Args:
+        account (model.Account): The account object containing user credentials.
+        repo (FollowerCache): The cache object to store followers or followings.
+        source (str): "dom" or "network", see commands.profile.extract_followers.
+        speed_profile (str): The name of the speed profile used to pace the scrolling.
+        lean (bool): Run headless and block images, media, fonts and tracking.
+        delta (bool): Stop once the newest names are already cached, see
+            ListExtractionState.reach_known_names.
+
+    Returns:
+        bool: True if all followers and followings were collected, False if
+            Instagram kept throttling the account.
+    """
+    metrics = ScrapeMetrics()
+
+    async with async_playwright() as playwright:
+        with metrics.phase("launch"):
+            browser = await playwright.chromium.launch(
+                **launch_options(lean, speed_profile)
+            )
+
+        try:
+            context = await new_context(browser, account, lean)
+            collected = await scrape_account(
+                context,
+                account,
+                repo,
+                metrics,
+                source=source,
+                speed_profile=speed_profile,
+                delta=delta,
+            )
+        finally:
+            await browser.close()
+
+    # The timings of a throttled run show where Instagram slowed down, keep them
+    metrics.throttled = not collected
+    report = export_run(metrics, account.get_encoded_username())
+
+    if not collected:
+        console.print_rate_limit_error()
+        print("💾 The names read so far are saved.")
+        print(f"Timings saved to {report}")
+        return False
+
+    print("✅ Successfully collected all information about your followers!")
+    print(
+        f"Took {metrics.elapsed:.1f}s in {len(metrics.cycles)} cycles, "
+        f"timings saved to {report}"
+    )
+    return True
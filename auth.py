@@ -1,72 +1,82 @@
 """
 This module provides authentication-related functions for the Follower Lens application.
-It includes functions for managing cookies, validating authentication configurations,
-and performing manual login.
+It includes functions for managing sessions, probing whether a session is still
+logged in, validating authentication configurations, and performing manual login.
+Sessions are stored as Playwright storage state, older session files holding
+only a list of cookies are still read.
 """
 
 import json
 import os
 import pathlib
-import time
+from enum import Enum
+from typing import Optional
 
+from playwright.async_api import BrowserContext as AsyncBrowserContext
 from playwright.sync_api import BrowserContext, Page
 
+import constants
 import model
 from utils.session_utils import get_session_path
 
+# The cookie banner and the login form, shared by the sync and async engines.
+COOKIE_CONSENT_TEXT = "Allow all cookies"
+USERNAME_LABEL = "Phone number, username, or email"
+PASSWORD_LABEL = "Password"
+SUBMIT_SELECTOR = "css=#loginForm [type=submit]"
 
-def get_cookies(account: model.Account):
+# Instagram redirects to an /accounts/ page once the form is submitted.
+LOGGED_IN_URL = "**/accounts/**"
+
+
+def get_storage_state(account: model.Account) -> Optional[dict]:
     """
-    Retrieves cookies from the session file.
+    Retrieves the Playwright storage state from the session file.
 
     Returns:
-        list: A list of cookies.
+        Optional[dict]: The storage state, or None if there is no usable session.
     """
-    out = []
     session_path = get_session_path(account)
 
-    if os.path.exists(session_path):
-        try:
-            out = json.loads(pathlib.Path(session_path).read_text(encoding="utf-8"))
-        except json.decoder.JSONDecodeError:
-            return out
+    if not os.path.exists(session_path):
+        return None
 
-    return out
+    try:
+        state = json.loads(pathlib.Path(session_path).read_text(encoding="utf-8"))
+    except json.decoder.JSONDecodeError:
+        return None
 
+    # Session files used to hold only the list of cookies
+    if isinstance(state, list):
+        state = {"cookies": state, "origins": []}
 
-def store_cookies(page: Page, account: model.Account):
-    """
-    Stores cookies to the session file.
+    if not isinstance(state, dict) or not state.get("cookies"):
+        return None
 
-    Args:
-        page (Page): The Playwright page object.
-    """
-    cookies = page.context.cookies()
-    session_path = get_session_path(account)
-    serialized_data = json.dumps(cookies)
-    file = pathlib.Path(session_path)
-    file.parent.mkdir(parents=True, exist_ok=True)
-    file.write_text(serialized_data, encoding="utf-8")
-    print("Stored latest cookies in session!")
+    return state
 
 
-def restore_cookies(context: BrowserContext, account: model.Account):
+def store_session(context: BrowserContext, account: model.Account):
     """
-    Restores cookies to the browser context.
+    Stores the storage state of the context (cookies and localStorage) to the session file.
 
     Args:
         context (BrowserContext): The Playwright browser context.
+    """
+    context.storage_state(path=session_file(account))
+    print("Stored latest session!")
+
+
+def session_file(account: model.Account) -> pathlib.Path:
+    """
+    Returns the session file of the account, its directory is created if missing.
 
     Returns:
-        bool: True if cookies were restored, False otherwise.
+        pathlib.Path: The path of the session file.
     """
-    restored = False
-    cookie_data = get_cookies(account)
-    if len(cookie_data) > 0:
-        print("Cookies added!")
-        context.add_cookies(cookie_data)
-        restored = True
-    return restored
+    file = pathlib.Path(get_session_path(account))
+    file.parent.mkdir(parents=True, exist_ok=True)
+    return file
 
 
 def validate_auth_configs(account: model.Account):
@@ -88,31 +98,123 @@ def manual_login(
     persist_session=True,
 ):
     """
-    Performs manual login and optionally stores the session cookies.
+    Performs manual login and optionally stores the session.
 
     Args:
         page (Page): The Playwright page object.
-        persist_session (bool): Whether to store the session cookies after login.
+        persist_session (bool): Whether to store the session after login.
     """
     validate_auth_configs(account)
 
-    btn = page.get_by_text("Allow all cookies")
+    btn = page.get_by_text(COOKIE_CONSENT_TEXT)
     if btn.count():
         btn.click()
 
     # Fill credentials
-    username_input = page.get_by_label("Phone number, username, or email")
+    username_input = page.get_by_label(USERNAME_LABEL)
     username_input.fill(account.email)
 
-    pwd_input = page.get_by_label("Password")
+    pwd_input = page.get_by_label(PASSWORD_LABEL)
     pwd_input.fill(account.password)
 
     # Hit the submit button to log in.
-    submit_btn = page.locator("css=#loginForm [type=submit]")
+    submit_btn = page.locator(SUBMIT_SELECTOR)
     submit_btn.click()
 
-    page.wait_for_url("**/accounts/**")
-    time.sleep(2)
+    page.wait_for_url(LOGGED_IN_URL)
+    page.wait_for_load_state("networkidle")
 
     if persist_session:
-        store_cookies(page, account)
+        store_session(page.context, account)
+
+
+class SessionStatus(Enum):
+    """The outcome of a session health probe."""
+
+    VALID = "valid"
+    EXPIRED = "expired"
+    RATE_LIMITED = "rate-limited"
+
+
+# A cheap JSON endpoint that only answers for a logged in user.
+PROBE_PATH = "/api/v1/accounts/current_user/?edit=true"
+
+# Instagram's web client id, without it the API refuses to answer.
+PROBE_HEADERS = {"X-IG-App-ID": "936619743392459", "Accept": "application/json"}
+
+
+def classify_probe_response(status: int, body: str) -> SessionStatus:
+    """
+    Tells from the response to the probe request whether the session works.
+
+    Args:
+        status (int): The HTTP status code.
+        body (str): The response body.
+
+    Returns:
+        SessionStatus: The status of the session.
+    """
+    if status == 429 or "Please wait a few minutes" in body:
+        return SessionStatus.RATE_LIMITED
+
+    if status != 200:
+        # 401/403 or a redirect to the login page
+        return SessionStatus.EXPIRED
+
+    try:
+        payload = json.loads(body)
+    except json.decoder.JSONDecodeError:
+        return SessionStatus.EXPIRED
+
+    if not isinstance(payload, dict) or payload.get("message") == "login_required":
+        return SessionStatus.EXPIRED
+
+    if payload.get("spam") or payload.get("message") == "rate_limit_error":
+        return SessionStatus.RATE_LIMITED
+
+    return SessionStatus.VALID if "user" in payload else SessionStatus.EXPIRED
+
+
+def probe_session(
+    context: BrowserContext, base_url: Optional[str] = None
+) -> SessionStatus:
+    """
+    Checks whether the cookies of the context are still logged in with a single
+    API request, without rendering any page.
+
+    Args:
+        context (BrowserContext): The Playwright browser context.
+        base_url (Optional[str]): The Instagram base URL, defaults to constants.IG_BASE_URL.
+
+    Returns:
+        SessionStatus: The status of the session.
+    """
+    response = context.request.get(
+        f"{base_url or constants.IG_BASE_URL}{PROBE_PATH}",
+        headers=PROBE_HEADERS,
+        max_redirects=0,
+        fail_on_status_code=False,
+    )
+    return classify_probe_response(response.status, response.text())
+
+
+async def probe_session_async(
+    context: AsyncBrowserContext, base_url: Optional[str] = None
+) -> SessionStatus:
+    """
+    The asyncio counterpart of probe_session.
+
+    Args:
+        context (AsyncBrowserContext): The Playwright browser context.
+        base_url (Optional[str]): The Instagram base URL, defaults to constants.IG_BASE_URL.
+
+    Returns:
+        SessionStatus: The status of the session.
+    """
+    response = await context.request.get(
+        f"{base_url or constants.IG_BASE_URL}{PROBE_PATH}",
+        headers=PROBE_HEADERS,
+        max_redirects=0,
+        fail_on_status_code=False,
+    )
+    return classify_probe_response(response.status, await response.text())
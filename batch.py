@@ -0,0 +1,229 @@
+"""
+This module provides a batch runner that collects followers and followings of many
+accounts with a single shared browser. Every account gets its own isolated browser
+context restored from its session file and its own cache file, accounts are
+processed by a bounded pool of workers on the async engine.
+
+Usage:
+
+    python batch.py accounts.json --workers 3
+
+where accounts.json is a list of {"username", "email", "password"} objects,
+email and password are only needed for accounts without a stored session.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from playwright.async_api import Browser, async_playwright
+
+import async_engine
+import console
+import constants
+from browser import launch_options
+from cache import open_cache
+from metrics import ScrapeMetrics, export_run
+from model import Account
+
+
+class AccountReport(NamedTuple):
+    """
+    The outcome of collecting the lists of a single account.
+
+    Attributes:
+        username (str): The username of the account.
+        collected (bool): True if both lists were collected.
+        names (int): The number of followers and followings in the cache afterwards.
+        new_names (int): The change of the number of cached names, negative if
+            users who left were removed.
+        names_read (int): The number of names read from Instagram by this run.
+        elapsed (float): Seconds spent on the account.
+        error (Optional[str]): Why the account failed, if it did.
+        report (Optional[Path]): The metrics report of the run, see metrics.export_run.
+    """
+
+    username: str
+    collected: bool
+    names: int
+    new_names: int
+    names_read: int
+    elapsed: float
+    error: Optional[str] = None
+    report: Optional[Path] = None
+
+    @property
+    def throughput(self) -> float:
+        """Names read per second."""
+        return self.names_read / self.elapsed if self.elapsed else 0.0
+
+
+def load_accounts(path: str) -> list[Account]:
+    """
+    Loads the accounts of a batch from a JSON file.
+
+    Args:
+        path (str): The path to a JSON list of {"username", "email", "password"} objects.
+
+    Raises:
+        ValueError: If an entry has no username.
+
+    Returns:
+        list[Account]: The accounts.
+    """
+    accounts = []
+    for entry in json.loads(Path(path).read_text(encoding="utf-8")):
+        if not entry.get("username"):
+            raise ValueError(f"Account without username in {path}: {entry}")
+
+        account = Account()
+        account.username = entry["username"]
+        account.email = entry.get("email")
+        account.password = entry.get("password")
+        accounts.append(account)
+
+    return accounts
+
+
+async def collect_account(
+    browser: Browser,
+    account: Account,
+    workers: asyncio.Semaphore,
+    lean=constants.LEAN_BROWSER,
+    **kwargs,
+) -> AccountReport:
+    """
+    Collects the lists of one account in its own browser context.
+
+    Args:
+        browser (Browser): The shared browser.
+        account (Account): The account to scrape.
+        workers (asyncio.Semaphore): Bounds the number of accounts scraped at once.
+        lean (bool): Block images, media, fonts and tracking in the context.
+        **kwargs: `source`, `speed_profile` and `delta`, see
+            async_engine.AsyncListExtraction.
+
+    Returns:
+        AccountReport: The outcome for the account.
+    """
+    async with workers:
+        repo = open_cache(
+            f"cache/{account.get_encoded_username()}", backend=constants.CACHE_BACKEND
+        )
+        names_before = len(repo.followers) + len(repo.followings)
+        started = time.perf_counter()
+        collected, error = False, None
+        metrics = ScrapeMetrics()
+
+        context = await async_engine.new_context(browser, account, lean)
+        try:
+            collected = await async_engine.scrape_account(
+                context, account, repo, metrics, **kwargs
+            )
+            if not collected:
+                error = "rate limited"
+        except Exception as e:  # pylint: disable=broad-except
+            # One broken account must not take down the whole batch
+            error = str(e)
+            repo.save()
+        finally:
+            await context.close()
+
+        metrics.throttled = error == "rate limited"
+        report = export_run(metrics, account.get_encoded_username())
+
+        names = len(repo.followers) + len(repo.followings)
+        return AccountReport(
+            username=account.username,
+            collected=collected,
+            names=names,
+            new_names=names - names_before,
+            names_read=metrics.names_read,
+            elapsed=time.perf_counter() - started,
+            error=error,
+            report=report,
+        )
+
+
+async def run_batch(
+    accounts: list[Account],
+    workers: int = 2,
+    source=constants.SCRAPE_SOURCE,
+    speed_profile=constants.SPEED_PROFILE,
+    lean=constants.LEAN_BROWSER,
+    delta=constants.DELTA_SYNC,
+) -> tuple[list[AccountReport], float]:
+    """
+    Collects followers and followings of all accounts sharing one browser process.
+
+    Args:
+        accounts (list[Account]): The accounts to scrape.
+        workers (int): How many accounts are scraped at the same time.
+        source (str): "dom" or "network", see commands.profile.extract_followers.
+        speed_profile (str): The name of the speed profile used to pace the scrolling.
+        lean (bool): Run headless and block images, media, fonts and tracking.
+        delta (bool): Stop once the newest names are already cached, see
+            ListExtractionState.reach_known_names.
+
+    Returns:
+        tuple[list[AccountReport], float]: A report per account and the total seconds.
+    """
+    started = time.perf_counter()
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(
+            **launch_options(lean, speed_profile)
+        )
+        pool = asyncio.Semaphore(workers)
+
+        try:
+            reports = await asyncio.gather(
+                *[
+                    collect_account(
+                        browser,
+                        account,
+                        pool,
+                        lean=lean,
+                        source=source,
+                        speed_profile=speed_profile,
+                        delta=delta,
+                    )
+                    for account in accounts
+                ]
+            )
+        finally:
+            await browser.close()
+
+    return list(reports), time.perf_counter() - started
+
+
+def main():
+    """
+    The entry point of the batch runner.
+    """
+    parser = argparse.ArgumentParser(
+        description="Collect followers and followings of many accounts with one browser."
+    )
+    parser.add_argument("accounts", help="JSON file with the accounts to scrape")
+    parser.add_argument(
+        "--workers", type=int, default=2, help="accounts scraped at the same time"
+    )
+    parser.add_argument(
+        "--lean",
+        action="store_true",
+        default=constants.LEAN_BROWSER,
+        help="run headless and block images, media, fonts and tracking",
+    )
+    args = parser.parse_args()
+
+    reports, elapsed = asyncio.run(
+        run_batch(load_accounts(args.accounts), workers=args.workers, lean=args.lean)
+    )
+    console.print_batch_report(reports, elapsed)
+
+
+if __name__ == "__main__":
+    main()
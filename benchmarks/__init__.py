@@ -0,0 +1,4 @@
+"""
+Offline benchmarks of Follower Lens, run them from the repository root with
+`python -m benchmarks.run`. They need neither a browser nor a network connection.
+"""
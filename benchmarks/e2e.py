@@ -0,0 +1,159 @@
+"""
+Runs the full Playwright scrape of main.run_simplified against the local mock
+site and reports the real names per second, with no network connection.
+Needs the Playwright browsers (`playwright install chromium`).
+
+Usage:
+    python -m benchmarks.e2e --sizes 1000 5000 --latency 0.05 --output e2e.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import constants
+from benchmarks.mock_site import MockSite, MockSiteConfig
+from benchmarks.run import describe_environment, synthetic_account
+from browser import BrowserSession
+from cache import FollowerCache
+from main import run_simplified
+from model import Account
+from scheduler import RequestScheduler
+
+
+def run_end_to_end(
+    size: int, latency: float = 0.0, rate_limited=False, lean=True, paced=False
+) -> dict:
+    """
+    Scrapes a mock account with the real browser.
+
+    Args:
+        size (int): The number of users per list.
+        latency (float): Seconds every API response of the mock site is delayed by.
+        rate_limited (bool): Whether the mock site throttles every request.
+        lean (bool): Whether to run the lean, headless browser profile.
+        paced (bool): Whether to pace the actions like a real sync does, by
+            default only the page waits limit the speed.
+
+    Returns:
+        dict: The timings and the number of names collected.
+    """
+    followers, followings = synthetic_account(size)
+    config = MockSiteConfig(
+        username="mock.user",
+        followers=followers,
+        followings=followings,
+        latency=latency,
+        rate_limited=rate_limited,
+    )
+
+    account = Account()
+    account.username = config.username
+    account.email = "mock.user@example.com"
+    account.password = "mock-password"
+
+    result = {
+        "name": "run_simplified",
+        "size": size,
+        "latency": latency,
+        "source": constants.SCRAPE_SOURCE,
+        "speed_profile": constants.SPEED_PROFILE,
+    }
+
+    # Give up on a throttled account after one short back off
+    if paced:
+        scheduler = RequestScheduler(initial_backoff=0.5, max_retries=1)
+    else:
+        scheduler = RequestScheduler(rate=None, initial_backoff=0.5, max_retries=1)
+
+    base_url, working_directory = constants.IG_BASE_URL, os.getcwd()
+    # Sessions and caches are written relative to the working directory
+    with tempfile.TemporaryDirectory() as directory, MockSite(config) as site:
+        os.chdir(directory)
+        constants.IG_BASE_URL = site.base_url
+        session = BrowserSession(account, lean=lean)
+        repo = FollowerCache(str(Path("cache", "mock")), preload=False, journaled=True)
+
+        try:
+            start = time.perf_counter()
+            session.start()
+            result["launch_seconds"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(sys.stderr):
+                collected = run_simplified(session, account, repo, scheduler)
+            result["rate_limited"] = not collected
+            seconds = time.perf_counter() - start
+        finally:
+            session.close()
+            constants.IG_BASE_URL = base_url
+            os.chdir(working_directory)
+
+    names = len(repo.followers) + len(repo.followings)
+    result.update(
+        {
+            "seconds": seconds,
+            "names": names,
+            "complete": names == len(followers) + len(followings),
+            "names_per_second": names / seconds if seconds else 0.0,
+        }
+    )
+    return result
+
+
+def main(argv: Optional[list[str]] = None):
+    """Run the end-to-end benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Scrape the local mock site with the real browser."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000], help="users per list"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds per API call"
+    )
+    parser.add_argument(
+        "--rate-limited",
+        action="store_true",
+        help="check that a throttled account is detected",
+    )
+    parser.add_argument(
+        "--paced", action="store_true", help="pace the actions like a real sync"
+    )
+    parser.add_argument("--headed", action="store_true", help="show the browser window")
+    parser.add_argument("--output", type=Path, help="write the JSON report to a file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in args.sizes:
+        result = run_end_to_end(
+            size,
+            args.latency,
+            rate_limited=args.rate_limited,
+            lean=not args.headed,
+            paced=args.paced,
+        )
+        results.append(result)
+        print(
+            f"{size:>9,} names/list  {result['names']:>9,} collected  "
+            f"{result['seconds']:.2f}s  {result['names_per_second']:.0f} names/s",
+            file=sys.stderr,
+        )
+
+    output = json.dumps(
+        {"environment": describe_environment(), "results": results}, indent=2
+    )
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+This module provides a stand-in for a Playwright page showing an Instagram profile,
+so the extraction can be driven without a browser. It understands exactly the
+selectors and scripts commands.profile uses and serves the followers dialog from
+in-memory lists, one page of rows per scroll, like Instagram does.
+"""
+
+import time
+from typing import Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+import constants
+from commands.harvest import HARVEST_SCRIPT, ROW_COUNT_SCRIPT
+from commands.network import FRIENDSHIPS_URL_PATTERN
+from commands.pacing import ROW_COUNT_GREW_SCRIPT
+from commands.profile import RESCROLL_SCRIPT, SCROLL_SCRIPT
+from scheduler import THROTTLE_SCRIPT
+
+
+class FakeResponse:
+    """A friendships API response, as seen by commands.network."""
+
+    def __init__(self, url: str, payload: dict, status: int = 200):
+        self.url = url
+        self.status = status
+        self.ok = status < 400
+        self._payload = payload
+
+    def json(self) -> dict:
+        """Return the decoded body."""
+        return self._payload
+
+
+class FakeAPIRequest:
+    """The `context.request` of the fake page, answers friendships API calls."""
+
+    def __init__(self, page: "FakeProfilePage"):
+        self.page = page
+        self.requests = 0
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        """Return the page of the list the URL asks for."""
+        self.requests += 1
+        match = FRIENDSHIPS_URL_PATTERN.search(url)
+        query = parse_qs(urlparse(url).query)
+        kind = match.group("kind")
+        start = int(query.get("max_id", ["0"])[0])
+        return FakeResponse(url, self.page.friendships_page(kind, start))
+
+
+class FakeContext:
+    """The browser context of the fake page."""
+
+    def __init__(self, page: "FakeProfilePage"):
+        self.request = FakeAPIRequest(page)
+
+
+class FakeLocator:
+    """A header link of the profile that opens the followers or following dialog."""
+
+    def __init__(self, page: "FakeProfilePage", kind: str):
+        self.page = page
+        self.kind = kind
+
+    @property
+    def first(self) -> "FakeLocator":
+        """Return the locator itself, there is only one match."""
+        return self
+
+    def wait_for(self, **kwargs):
+        """Return at once, the header is always rendered."""
+
+    def text_content(self) -> str:
+        """Return the label of the link, e.g. "1,204 followers"."""
+        count = len(self.page.lists[self.kind])
+        label = "followers" if self.kind == "followers" else "following"
+        return f"{count:,} {label}"
+
+    def click(self):
+        """Open the dialog of the list."""
+        self.page.open_dialog(self.kind)
+
+    def count(self) -> int:
+        """Return 1, the link is always there."""
+        return 1
+
+
+class FakeProfilePage:
+    """
+    A fake Playwright page of a profile with a followers and a following dialog.
+
+    Attributes:
+        lists (dict[str, list[str]]): The usernames of "followers" and "following".
+        rows (list[str]): The usernames rendered in the open dialog.
+        scroll_times (list[float]): The perf_counter() value of every scroll, so the
+            time of each extraction cycle can be told afterwards.
+        throttled_scrolls (int): How many of the next scrolls Instagram refuses,
+            showing a throttling message instead of loading the page.
+        throttled (bool): Whether the throttling message is shown.
+    """
+
+    def __init__(
+        self,
+        followers: list[str],
+        followings: list[str],
+        page_size: int = 12,
+        user_id: str = "1",
+    ):
+        self.lists = {"followers": followers, "following": followings}
+        self.page_size = page_size
+        self.user_id = user_id
+        self.url = f"{constants.IG_BASE_URL}/benchmark/"
+        self.rows: list[str] = []
+        self.scroll_times: list[float] = []
+        self.throttled_scrolls = 0
+        self.throttled = False
+        self.context = FakeContext(self)
+        self._kind: Optional[str] = None
+        self._listeners: list[Callable] = []
+
+    def locator(self, selector: str) -> FakeLocator:
+        """Return the header link the selector points at."""
+        return FakeLocator(
+            self, "followers" if "followers" in selector else "following"
+        )
+
+    def open_dialog(self, kind: str):
+        """Show the dialog of a list with its first page loaded."""
+        self._kind = kind
+        self.rows = []
+        self.scroll_times = []
+        self._load_next_page()
+
+    def evaluate(self, script: str, arg=None):
+        """Run one of the scripts commands.profile sends to the browser."""
+        if script == HARVEST_SCRIPT:
+            return self.rows[arg:]
+        if script == ROW_COUNT_SCRIPT:
+            return len(self.rows)
+        if script == SCROLL_SCRIPT:
+            self.scroll_times.append(time.perf_counter())
+            self._load_next_page()
+            return None
+        if script == RESCROLL_SCRIPT:
+            self._load_next_page()
+            return None
+        if script == THROTTLE_SCRIPT:
+            return self.throttled
+        raise ValueError(f"The fake page can't run script: {script[:40]}...")
+
+    def wait_for_function(self, script: str, arg=None, **kwargs):
+        """Return once the dialog grew, which is instantly or never."""
+        if script != ROW_COUNT_GREW_SCRIPT:
+            raise ValueError(f"The fake page can't wait for script: {script[:40]}...")
+        if len(self.rows) <= arg:
+            raise PlaywrightTimeoutError("No new rows were loaded")
+
+    def wait_for_timeout(self, timeout: float):
+        """Return at once, responses are delivered synchronously."""
+
+    def on(self, event: str, handler: Callable):
+        """Subscribe to the "response" event."""
+        if event == "response":
+            self._listeners.append(handler)
+
+    def remove_listener(self, event: str, handler: Callable):
+        """Unsubscribe from the "response" event."""
+        if event == "response" and handler in self._listeners:
+            self._listeners.remove(handler)
+
+    def friendships_page(self, kind: str, start: int) -> dict:
+        """Return the API payload of the page of a list starting at `start`."""
+        names = self.lists[kind]
+        end = start + self.page_size
+        return {
+            "users": [{"username": name} for name in names[start:end]],
+            "next_max_id": str(end) if end < len(names) else None,
+        }
+
+    def _load_next_page(self):
+        """Append the next page of the open list to the dialog and answer its API call."""
+        names = self.lists[self._kind]
+        start = len(self.rows)
+        if start >= len(names) and start > 0:
+            return
+
+        url = (
+            f"{constants.IG_BASE_URL}/api/v1/friendships/{self.user_id}/{self._kind}/"
+            f"?count={self.page_size}&max_id={start}"
+        )
+
+        self.throttled = self.throttled_scrolls > 0 and start > 0
+        if self.throttled:
+            self.throttled_scrolls -= 1
+            for listener in list(self._listeners):
+                listener(FakeResponse(url, {}, status=429))
+            return
+
+        payload = self.friendships_page(self._kind, start)
+        self.rows.extend(user["username"] for user in payload["users"])
+
+        for listener in list(self._listeners):
+            listener(FakeResponse(url, payload))
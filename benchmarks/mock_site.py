@@ -0,0 +1,374 @@
+"""
+This module serves a local stand-in of the Instagram pages the scraper touches:
+a login form, a profile with the followers/following header links, the
+infinite-scroll followers dialog and the JSON endpoints behind it. Latency and
+rate limiting can be configured, so the full Playwright path can be measured
+without a network connection.
+
+Usage:
+    python -m benchmarks.mock_site --followers 5000 --latency 0.05 --port 8000
+    FOLLOWER_LENS_BASE_URL=http://127.0.0.1:8000 python main.py
+"""
+
+import argparse
+import html
+import json
+import threading
+import time
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qs, urlparse
+
+from auth import PROBE_PATH
+from commands.network import FRIENDSHIPS_URL_PATTERN
+
+SESSION_COOKIE = "sessionid"
+
+RATE_LIMIT_MESSAGE = "Please wait a few minutes before you try again."
+
+
+class MockSiteConfig(NamedTuple):
+    """
+    The account served by the mock site and how the site behaves.
+
+    Attributes:
+        username (str): The username of the profile.
+        followers (list[str]): The followers of the profile.
+        followings (list[str]): The accounts the profile follows.
+        user_id (str): The id of the profile in the friendships API URLs.
+        page_size (int): The number of users per page of the dialog.
+        latency (float): Seconds every API response is delayed by.
+        logged_in (bool): Whether the session cookie is not needed to browse.
+        rate_limited (bool): Whether every request is answered with a rate limit error.
+        rate_limit_after (Optional[int]): The number of friendships API requests
+            served before the rate limit kicks in.
+    """
+
+    username: str
+    followers: list[str]
+    followings: list[str]
+    user_id: str = "1"
+    page_size: int = 12
+    latency: float = 0.0
+    logged_in: bool = False
+    rate_limited: bool = False
+    rate_limit_after: Optional[int] = None
+
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Login • Instagram</title></head>
+<body>
+<form id="loginForm" method="post" action="/accounts/login/ajax/">
+  <label>Phone number, username, or email <input name="username" type="text"></label>
+  <label>Password <input name="password" type="password"></label>
+  <button type="submit">Log in</button>
+</form>
+</body></html>"""
+
+HOME_PAGE = """<!DOCTYPE html>
+<html><head><title>Instagram</title></head>
+<body><nav><a href="/" aria-label="For you">For you</a></nav></body></html>"""
+
+ONETAP_PAGE = """<!DOCTYPE html>
+<html><head><title>Save your login info? • Instagram</title></head>
+<body><a href="/">Not now</a></body></html>"""
+
+RATE_LIMIT_PAGE = f"""<!DOCTYPE html>
+<html><head><title>Instagram</title></head>
+<body><p>{RATE_LIMIT_MESSAGE}</p></body></html>"""
+
+# The dialog mirrors the markup commands.profile relies on: links in the header,
+# rows as `a[role=link] span` and a scroll container whose child is styled
+# `overflow: hidden auto;`. Scrolling near the bottom fetches the next page.
+PROFILE_PAGE = """<!DOCTYPE html>
+<html><head><title>@{username} • Instagram</title>
+<style>
+  [role=dialog] .scroller {{ height: 400px; overflow-y: auto; }}
+  [role=dialog] a[role=link] {{ display: block; height: 40px; }}
+</style></head>
+<body>
+<header><ul>
+  <li><a role="link" href="/{username}/followers/" data-kind="followers">{followers} followers</a></li>
+  <li><a role="link" href="/{username}/following/" data-kind="following">{followings} following</a></li>
+</ul></header>
+<script>
+const USER_ID = "{user_id}";
+const PAGE_SIZE = {page_size};
+
+function openDialog(kind) {{
+  document.querySelector("[role=dialog]")?.remove();
+  const dialog = document.createElement("div");
+  dialog.setAttribute("role", "dialog");
+  dialog.innerHTML = '<button class="close"><svg aria-label="Close"><title>Close</title></svg></button>'
+    + '<div class="scroller"><div style="overflow: hidden auto;"></div></div>';
+  document.body.appendChild(dialog);
+
+  const scroller = dialog.querySelector(".scroller");
+  const list = scroller.firstElementChild;
+  let cursor = "0", loading = false;
+
+  async function loadPage() {{
+    if (cursor === null || loading) return;
+    loading = true;
+    const url = `/api/v1/friendships/${{USER_ID}}/${{kind}}/?count=${{PAGE_SIZE}}&max_id=${{cursor}}`;
+    const response = await fetch(url, {{headers: {{"Accept": "application/json"}}}});
+    loading = false;
+    if (!response.ok) return;
+
+    const payload = await response.json();
+    for (const user of payload.users) {{
+      const row = document.createElement("a");
+      row.setAttribute("role", "link");
+      row.href = `/${{user.username}}/`;
+      const span = document.createElement("span");
+      span.textContent = user.username;
+      row.appendChild(span);
+      list.appendChild(row);
+    }}
+    cursor = payload.next_max_id;
+  }}
+
+  scroller.addEventListener("scroll", () => {{
+    if (scroller.scrollTop + scroller.clientHeight >= scroller.scrollHeight - 50) loadPage();
+  }});
+  dialog.querySelector(".close").addEventListener("click", () => {{
+    dialog.remove();
+    history.pushState(null, "", "/{username}/");
+  }});
+
+  history.pushState(null, "", `/{username}/${{kind}}/`);
+  loadPage();
+}}
+
+for (const link of document.querySelectorAll("header [role=link]")) {{
+  link.addEventListener("click", (event) => {{
+    event.preventDefault();
+    openDialog(link.dataset.kind);
+  }});
+}}
+</script>
+</body></html>"""
+
+
+def friendships_page(names: list[str], cursor: int, page_size: int) -> dict:
+    """
+    Builds one page of a friendships API response.
+
+    Args:
+        names (list[str]): All users of the list.
+        cursor (int): The index of the first user of the page.
+        page_size (int): The number of users per page.
+
+    Returns:
+        dict: The payload, shaped like Instagram's.
+    """
+    end = cursor + page_size
+    return {
+        "users": [{"username": name} for name in names[cursor:end]],
+        "next_max_id": str(end) if end < len(names) else None,
+        "status": "ok",
+    }
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    """Answers the requests of the browser, see MockSite."""
+
+    server: "MockSiteServer"
+
+    def log_message(self, format, *args):
+        """Keep the output of benchmarks clean."""
+
+    def do_GET(self):
+        """Serve pages and API endpoints."""
+        config = self.server.config
+        url = urlparse(self.path)
+
+        if config.rate_limited:
+            return self._send_rate_limit()
+
+        if self.path == PROBE_PATH:
+            if not self._logged_in():
+                return self._send_json(
+                    {"message": "login_required"}, HTTPStatus.UNAUTHORIZED
+                )
+            return self._send_json({"user": {"username": config.username}})
+
+        match = FRIENDSHIPS_URL_PATTERN.search(url.path)
+        if match is not None:
+            return self._send_friendships(match.group("kind"), parse_qs(url.query))
+
+        if url.path == "/":
+            return self._send_html(HOME_PAGE if self._logged_in() else LOGIN_PAGE)
+
+        if url.path.startswith("/accounts/"):
+            return self._send_html(ONETAP_PAGE)
+
+        if url.path.strip("/").split("/")[0] == config.username:
+            if not self._logged_in():
+                return self._send_html(LOGIN_PAGE)
+            return self._send_html(
+                PROFILE_PAGE.format(
+                    username=html.escape(config.username),
+                    followers=f"{len(config.followers):,}",
+                    followings=f"{len(config.followings):,}",
+                    user_id=config.user_id,
+                    page_size=config.page_size,
+                )
+            )
+
+        self._send_html(
+            "<p>Sorry, this page isn't available.</p>", HTTPStatus.NOT_FOUND
+        )
+
+    def do_POST(self):
+        """Log in with any credentials."""
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        if self.server.config.rate_limited:
+            return self._send_rate_limit()
+
+        self.send_response(HTTPStatus.FOUND)
+        self.send_header("Location", "/accounts/onetap/")
+        self.send_header("Set-Cookie", f"{SESSION_COOKIE}=mock; Path=/")
+        self.end_headers()
+
+    def _logged_in(self) -> bool:
+        """Check if the request carries the session cookie."""
+        if self.server.config.logged_in:
+            return True
+        cookies = SimpleCookie(self.headers.get("Cookie", ""))
+        return SESSION_COOKIE in cookies
+
+    def _send_friendships(self, kind: str, query: dict):
+        """Serve one page of followers or followings after the configured latency."""
+        config = self.server.config
+        if not self._logged_in():
+            return self._send_json(
+                {"message": "login_required"}, HTTPStatus.UNAUTHORIZED
+            )
+
+        if self.server.count_api_request() > (config.rate_limit_after or float("inf")):
+            return self._send_rate_limit()
+
+        time.sleep(config.latency)
+        names = config.followers if kind == "followers" else config.followings
+        cursor = int(query.get("max_id", ["0"])[0] or 0)
+        self._send_json(friendships_page(names, cursor, config.page_size))
+
+    def _send_rate_limit(self):
+        """Answer like Instagram does when it throttles an account."""
+        if "application/json" in self.headers.get("Accept", ""):
+            payload = {"message": RATE_LIMIT_MESSAGE, "spam": True, "status": "fail"}
+            return self._send_json(payload, HTTPStatus.TOO_MANY_REQUESTS)
+        self._send_html(RATE_LIMIT_PAGE, HTTPStatus.TOO_MANY_REQUESTS)
+
+    def _send_html(self, body: str, status=HTTPStatus.OK):
+        """Send an HTML page."""
+        self._send(body.encode(), "text/html; charset=utf-8", status)
+
+    def _send_json(self, payload: dict, status=HTTPStatus.OK):
+        """Send a JSON document."""
+        self._send(json.dumps(payload).encode(), "application/json", status)
+
+    def _send(self, body: bytes, content_type: str, status: HTTPStatus):
+        """Send a response with a body."""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockSiteServer(ThreadingHTTPServer):
+    """An HTTP server that knows the configuration of the mock site."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: MockSiteConfig):
+        super().__init__(address, MockSiteHandler)
+        self.config = config
+        self.api_requests = 0
+        self._lock = threading.Lock()
+
+    def count_api_request(self) -> int:
+        """Count a friendships API request, return how many were made so far."""
+        with self._lock:
+            self.api_requests += 1
+            return self.api_requests
+
+
+class MockSite:
+    """
+    Runs the mock site in a background thread.
+
+    Example:
+        with MockSite(config) as site:
+            constants.IG_BASE_URL = site.base_url
+    """
+
+    def __init__(self, config: MockSiteConfig, host="127.0.0.1", port=0):
+        self.server = MockSiteServer((host, port), config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """The URL to use instead of constants.IG_BASE_URL."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockSite":
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockSite":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv: Optional[list[str]] = None):
+    """Serve the mock site from the command line until interrupted."""
+    from benchmarks.run import synthetic_account
+
+    parser = argparse.ArgumentParser(description="Serve a local mock of Instagram.")
+    parser.add_argument("--username", default="mock.user")
+    parser.add_argument("--followers", type=int, default=1000, help="users per list")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds per API call"
+    )
+    parser.add_argument("--rate-limited", action="store_true")
+    parser.add_argument("--rate-limit-after", type=int)
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    followers, followings = synthetic_account(args.followers)
+    config = MockSiteConfig(
+        username=args.username,
+        followers=followers,
+        followings=followings,
+        latency=args.latency,
+        rate_limited=args.rate_limited,
+        rate_limit_after=args.rate_limit_after,
+    )
+
+    site = MockSite(config, port=args.port)
+    print(f"Serving @{args.username} on {site.base_url}, press Ctrl+C to stop")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        site.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
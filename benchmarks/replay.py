@@ -0,0 +1,193 @@
+"""
+Replays recorded friendships API responses through commands.network, so the
+parsing of Instagram's payloads is checked without a browser or an account.
+A fixture holds the responses of one list in the order they arrived, including
+refused pages, and the names and cursors they must yield.
+
+Usage:
+    python -m benchmarks.replay
+    python -m benchmarks.replay benchmarks/fixtures/friendships_followers.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fake_page import FakeResponse
+from commands.network import FRIENDSHIPS_URL_PATTERN, FollowerResponseCollector
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def load_fixture(path: Path) -> dict:
+    """
+    Loads a recorded fixture.
+
+    Args:
+        path (Path): The JSON file with the "list", "responses" and "expected" keys.
+
+    Returns:
+        dict: The fixture.
+    """
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def recorded_responses(fixture: dict) -> list[FakeResponse]:
+    """Return the recorded responses of a fixture, as the page would emit them."""
+    return [
+        FakeResponse(response["url"], response["body"], response["status"])
+        for response in fixture["responses"]
+    ]
+
+
+def replay_events(fixture: dict) -> dict:
+    """
+    Feeds the recorded responses to the "response" event handler of a collector,
+    like the dialog does while it is scrolled.
+
+    Args:
+        fixture (dict): The recorded fixture.
+
+    Returns:
+        dict: The names, the cursor after every page read, the profile id and
+            how many pages were refused with a rate limit.
+    """
+    collector = FollowerResponseCollector(fixture["list"] == "followers")
+    cursors, rate_limited = [], 0
+
+    for response in recorded_responses(fixture):
+        pages = collector.pages
+        collector.on_response(response)
+        if collector.take_throttled():
+            rate_limited += 1
+        if collector.pages > pages:
+            cursors.append(collector.next_cursor)
+
+    return {
+        "names": collector.drain(),
+        "cursors": cursors,
+        "user_id": collector.user_id,
+        "rate_limited": rate_limited,
+        "exhausted": collector.exhausted,
+    }
+
+
+class RecordedRequest:
+    """
+    The `context.request` of a page that answers from the recorded responses,
+    matched by list and cursor in the order they were recorded.
+    """
+
+    def __init__(self, fixture: dict):
+        self.responses = recorded_responses(fixture)
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        """
+        Return the first unused recorded response for the list and cursor of the
+        URL, a page that wasn't recorded is not found.
+        """
+        for position, response in enumerate(self.responses):
+            if _page_key(response.url) == _page_key(url):
+                return self.responses.pop(position)
+        return FakeResponse(url, {}, status=404)
+
+
+class RecordedPage:
+    """A page whose context requests are answered by a RecordedRequest."""
+
+    def __init__(self, fixture: dict):
+        self.context = self
+        self.request = RecordedRequest(fixture)
+
+
+def _page_key(url: str) -> tuple[Optional[str], Optional[str]]:
+    """Return the list and the cursor a friendships API URL asks for."""
+    match = FRIENDSHIPS_URL_PATTERN.search(url)
+    cursor = parse_qs(urlparse(url).query).get("max_id", [None])[0]
+    return (match.group("kind") if match else None, cursor)
+
+
+def replay_cursors(fixture: dict) -> dict:
+    """
+    Requests the pages after the first one from their cursors, like an extraction
+    resumed from a checkpoint does, retrying a page refused with a rate limit.
+
+    Args:
+        fixture (dict): The recorded fixture.
+
+    Returns:
+        dict: The same keys as replay_events.
+    """
+    # The first page is the one the dialog loads, it carries the profile id
+    page = RecordedPage(fixture)
+    first = page.request.responses.pop(0)
+    collector = FollowerResponseCollector(fixture["list"] == "followers")
+    collector.feed(first.url, first.json())
+    cursors, rate_limited = [collector.next_cursor], 0
+
+    while not collector.exhausted:
+        if collector.fetch_next(page, count=5):
+            cursors.append(collector.next_cursor)
+        elif collector.take_throttled():
+            rate_limited += 1
+        else:
+            break
+
+    return {
+        "names": collector.drain(),
+        "cursors": cursors,
+        "user_id": collector.user_id,
+        "rate_limited": rate_limited,
+        "exhausted": collector.exhausted,
+    }
+
+
+def check(fixture: dict) -> list[str]:
+    """
+    Replays a fixture both ways and compares the outcome with the expected one.
+
+    Args:
+        fixture (dict): The recorded fixture.
+
+    Returns:
+        list[str]: A description of every mismatch, empty if the fixture passes.
+    """
+    expected = {**fixture["expected"], "exhausted": True}
+    problems = []
+    for mode, replay in (("events", replay_events), ("cursors", replay_cursors)):
+        result = replay(fixture)
+        for key, value in expected.items():
+            if result[key] != value:
+                problems.append(f"{mode}: {key} is {result[key]!r}, expected {value!r}")
+    return problems
+
+
+def main(argv: Optional[list[str]] = None):
+    """Check the recorded fixtures from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Replay recorded friendships API responses through the parser."
+    )
+    parser.add_argument(
+        "fixtures",
+        type=Path,
+        nargs="*",
+        help="fixture files, all files in benchmarks/fixtures by default",
+    )
+    args = parser.parse_args(argv)
+
+    failed = False
+    for path in args.fixtures or sorted(FIXTURES_DIR.glob("friendships_*.json")):
+        problems = check(load_fixture(path))
+        failed = failed or bool(problems)
+        print(f"{'FAIL' if problems else 'ok':<4} {path.name}", file=sys.stderr)
+        for problem in problems:
+            print(f"     {problem}", file=sys.stderr)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Runs the offline benchmarks on synthetic accounts and prints the results as JSON,
+so they can be stored and compared between versions.
+
+Usage:
+    python -m benchmarks.run --sizes 1000 10000 --output results.json
+    python -m benchmarks.run --compare results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+from rich.console import Console
+
+import console
+from analyzer import FollowerInsights
+from benchmarks.fake_page import FakeProfilePage
+from cache import FollowerCache
+from commands.profile import extract_followers
+from scheduler import RequestScheduler
+from snapshot_file import BinaryFollowerCache
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+class Benchmark(NamedTuple):
+    """
+    A benchmark case.
+
+    Attributes:
+        name (str): The name the results are reported under.
+        run (Callable): Takes the followers and followings, returns the seconds
+            the measured part took and a dict of extra metrics.
+        max_size (Optional[int]): Bigger accounts are skipped unless limits are off.
+        repeat (int): How many times to run it per size.
+    """
+
+    name: str
+    run: Callable[[list[str], list[str]], tuple[float, dict]]
+    max_size: Optional[int] = None
+    repeat: int = 3
+
+
+def synthetic_account(size: int, seed: int = 0) -> tuple[list[str], list[str]]:
+    """
+    Generates the followers and followings of an account with `size` users in
+    every list. Half of the users are in both lists.
+
+    Args:
+        size (int): The number of users per list.
+        seed (int): The seed of the random usernames.
+
+    Returns:
+        tuple[list[str], list[str]]: The followers and the followings.
+    """
+    rng = random.Random(seed)
+    alphabet = string.ascii_lowercase + string.digits + "._"
+    names = set()
+    while len(names) < size + size // 2:
+        names.add("".join(rng.choices(alphabet, k=rng.randint(6, 20))))
+
+    names = list(names)
+    rng.shuffle(names)
+    return names[:size], names[size // 2 : size + size // 2]
+
+
+def _timed(action: Callable[[], object]) -> float:
+    """Return the seconds an action took."""
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
+
+
+def _filled_cache(path: Path, followers, followings, journaled=False) -> FollowerCache:
+    """Return a cache holding the lists, without saving it."""
+    repo = FollowerCache(str(path), preload=False, journaled=journaled)
+    for name in followers:
+        repo.followers.add(name)
+    for name in followings:
+        repo.followings.add(name)
+    return repo
+
+
+def bench_cache_save(followers, followings):
+    """Rewrite the whole JSON cache."""
+    with tempfile.TemporaryDirectory() as directory:
+        repo = _filled_cache(Path(directory, "cache"), followers, followings)
+        seconds = _timed(repo.save)
+        return seconds, {"bytes": repo.file.stat().st_size}
+
+
+def bench_cache_load(followers, followings):
+    """Read the JSON cache from disk."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "cache")
+        _filled_cache(path, followers, followings).save()
+        return _timed(lambda: FollowerCache(str(path))), {}
+
+
+def bench_snapshot_load(followers, followings):
+    """Open the binary snapshot cache and look up every follower."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory, "cache"))
+        repo = BinaryFollowerCache(path, preload=False)
+        repo.followers.storage = set(followers)
+        repo.followings.storage = set(followings)
+        repo.compact()
+        repo.close()
+
+        start = time.perf_counter()
+        repo = BinaryFollowerCache(path)
+        seconds = time.perf_counter() - start
+
+        lookups = _timed(lambda: all(map(repo.followers.contains, followers)))
+        repo.close()
+        return seconds, {
+            "bytes": repo.file.stat().st_size,
+            "seconds_per_lookup": lookups / len(followers) if followers else 0.0,
+        }
+
+
+def bench_journal_save_page(followers, followings):
+    """Save one page of new names to a journaled cache of the account."""
+    with tempfile.TemporaryDirectory() as directory:
+        repo = _filled_cache(
+            Path(directory, "cache"), followers, followings, journaled=True
+        )
+        repo.compact()
+        for index in range(12):
+            repo.followers.add(f"new.follower.{index}")
+        return _timed(repo.save), {}
+
+
+def bench_full_insights(followers, followings):
+    """Classify every user from scratch."""
+    insights = FollowerInsights()
+
+    def build():
+        insights.load(followers, followings)
+        return insights.get_full_insights()
+
+    return _timed(build), {}
+
+
+def bench_set_operations(followers, followings):
+    """List haters, ghosts and mutuals of a loaded account."""
+    insights = FollowerInsights()
+    insights.load(followers, followings)
+
+    def lists():
+        insights.get_haters_list()
+        insights.get_ghosts_list()
+        insights.get_mutuals_list()
+
+    return _timed(lists), {}
+
+
+def bench_print_stats(followers, followings):
+    """Render the table of all users."""
+    insights = FollowerInsights()
+    insights.load(followers, followings)
+    records = insights.get_full_insights()
+
+    terminal, console.console = console.console, Console(
+        file=io.StringIO(), width=120, force_terminal=True
+    )
+    try:
+        return _timed(lambda: console.print_followers_stats(records)), {}
+    finally:
+        console.console = terminal
+
+
+def _bench_extraction(source: str):
+    """Build a benchmark of extract_followers reading names from `source`."""
+
+    def bench(followers, followings):
+        page = FakeProfilePage(followers, followings)
+
+        with tempfile.TemporaryDirectory() as directory:
+            repo = FollowerCache(
+                str(Path(directory, "cache")), preload=False, journaled=True
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                seconds = _timed(
+                    lambda: extract_followers(
+                        page,
+                        repo,
+                        my_followers=True,
+                        source=source,
+                        speed_profile="fast",
+                        scheduler=RequestScheduler(rate=None),
+                    )
+                )
+
+        marks = page.scroll_times
+        cycles = [end - start for start, end in zip(marks, marks[1:])]
+        quantiles = (
+            statistics.quantiles(cycles, n=20) if len(cycles) > 1 else [0.0] * 19
+        )
+        return seconds, {
+            "names": len(repo.followers),
+            "cycles": len(marks),
+            "names_per_second": len(repo.followers) / seconds if seconds else 0.0,
+            "cycle_seconds": {
+                "mean": statistics.fmean(cycles) if cycles else 0.0,
+                "p50": quantiles[9],
+                "p95": quantiles[18],
+                "max": max(cycles, default=0.0),
+            },
+        }
+
+    return bench
+
+
+BENCHMARKS = [
+    Benchmark("cache_save", bench_cache_save),
+    Benchmark("cache_load", bench_cache_load),
+    Benchmark("snapshot_load", bench_snapshot_load),
+    Benchmark("journal_save_page", bench_journal_save_page),
+    Benchmark("full_insights", bench_full_insights),
+    Benchmark("set_operations", bench_set_operations),
+    Benchmark("print_followers_stats", bench_print_stats, max_size=10_000, repeat=1),
+    Benchmark(
+        "extract_followers_dom", _bench_extraction("dom"), max_size=100_000, repeat=1
+    ),
+    Benchmark(
+        "extract_followers_network",
+        _bench_extraction("network"),
+        max_size=100_000,
+        repeat=1,
+    ),
+]
+
+
+def run_benchmarks(
+    sizes: list[int],
+    only: Optional[list[str]] = None,
+    limits=True,
+    repeat: Optional[int] = None,
+) -> list[dict]:
+    """
+    Runs the benchmarks on accounts of every size.
+
+    Args:
+        sizes (list[int]): The number of users per list of the synthetic accounts.
+        only (Optional[list[str]]): The names of the benchmarks to run, all by default.
+        limits (bool): Whether to skip sizes above the limit of a benchmark.
+        repeat (Optional[int]): Overrides how many times every benchmark runs.
+
+    Returns:
+        list[dict]: One result per benchmark and size.
+    """
+    results = []
+    for size in sizes:
+        followers, followings = synthetic_account(size)
+
+        for benchmark in BENCHMARKS:
+            if only and benchmark.name not in only:
+                continue
+
+            result = {"name": benchmark.name, "size": size}
+            if limits and benchmark.max_size is not None and size > benchmark.max_size:
+                results.append({**result, "skipped": True})
+                continue
+
+            runs = [
+                benchmark.run(followers, followings)
+                for _ in range(repeat or benchmark.repeat)
+            ]
+            seconds = [run_seconds for run_seconds, _ in runs]
+            result["seconds"] = {
+                "min": min(seconds),
+                "mean": statistics.fmean(seconds),
+                "max": max(seconds),
+            }
+            result.update(runs[-1][1])
+            results.append(result)
+
+            print(
+                f"{benchmark.name:<28} {size:>9,}  {result['seconds']['min']:.4f}s",
+                file=sys.stderr,
+            )
+
+    return results
+
+
+def describe_environment() -> dict:
+    """Return the version of the code and of the interpreter the results belong to."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def compare_results(baseline: dict, report: dict, threshold: float) -> list[str]:
+    """
+    Finds the benchmarks that got slower than a baseline.
+
+    Args:
+        baseline (dict): A report of a previous run.
+        report (dict): The report of this run.
+        threshold (float): The ratio of the new to the old minimum time above
+            which a benchmark counts as a regression, e.g. 1.2 for 20% slower.
+
+    Returns:
+        list[str]: A description of every regression.
+    """
+    previous = {
+        (result["name"], result["size"]): result["seconds"]["min"]
+        for result in baseline["results"]
+        if "seconds" in result
+    }
+
+    regressions = []
+    for result in report["results"]:
+        old_seconds = previous.get((result["name"], result["size"]))
+        if old_seconds is None or "seconds" not in result or not old_seconds:
+            continue
+
+        ratio = result["seconds"]["min"] / old_seconds
+        if ratio > threshold:
+            regressions.append(
+                f"{result['name']} ({result['size']:,} names): "
+                f"{old_seconds:.4f}s -> {result['seconds']['min']:.4f}s (x{ratio:.2f})"
+            )
+
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None):
+    """Run the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description="Run the offline benchmarks.")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="users per list"
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=[benchmark.name for benchmark in BENCHMARKS],
+        help="run only these benchmarks",
+    )
+    parser.add_argument("--repeat", type=int, help="runs per benchmark and size")
+    parser.add_argument(
+        "--no-limits",
+        action="store_true",
+        help="also run slow benchmarks on accounts above their size limit",
+    )
+    parser.add_argument("--output", type=Path, help="write the JSON report to a file")
+    parser.add_argument(
+        "--compare", type=Path, help="a previous JSON report to check for regressions"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="slowdown ratio counted as a regression (default: 1.2)",
+    )
+    args = parser.parse_args(argv)
+
+    report = {
+        "environment": describe_environment(),
+        "results": run_benchmarks(
+            args.sizes, args.only, limits=not args.no_limits, repeat=args.repeat
+        ),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare_results(baseline, report, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+This module provides the browser profiles used for scraping and a warm browser
+session that is reused across menu actions. The lean profile runs headless and
+aborts every request that is not needed to read usernames: images, media, fonts
+and tracking calls.
+"""
+
+from typing import Optional
+
+from playwright.async_api import BrowserContext as AsyncBrowserContext
+from playwright.async_api import Route as AsyncRoute
+from playwright.sync_api import (
+    Browser,
+    BrowserContext,
+    Page,
+    Playwright,
+    Route,
+    sync_playwright,
+)
+
+import auth
+import constants
+import model
+from commands.pacing import get_speed_profile
+
+# Resource types that carry nothing but pixels and glyphs.
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+# Analytics and logging endpoints hit while scrolling.
+TRACKING_URL_PARTS = (
+    "/logging/",
+    "/logging_client_events",
+    "/ajax/bz",
+    "facebook.com/tr",
+    "connect.facebook.net",
+    "doubleclick.net",
+    "google-analytics.com",
+)
+
+
+def launch_options(lean: bool, speed_profile: str) -> dict:
+    """
+    Returns the keyword arguments for `playwright.chromium.launch`.
+
+    Args:
+        lean (bool): Whether to run the lean, headless profile.
+        speed_profile (str): The name of the speed profile used to pace the scrolling.
+
+    Returns:
+        dict: The launch options.
+    """
+    return {"headless": lean, "slow_mo": get_speed_profile(speed_profile).slow_mo}
+
+
+def should_block(resource_type: str, url: str) -> bool:
+    """
+    Check if the lean profile aborts a request.
+
+    Args:
+        resource_type (str): The Playwright resource type of the request.
+        url (str): The URL of the request.
+
+    Returns:
+        bool: True if the request is not needed to read usernames.
+    """
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    return any(part in url for part in TRACKING_URL_PARTS)
+
+
+def _handle_route(route: Route):
+    """Aborts unneeded requests, lets everything else through."""
+    if should_block(route.request.resource_type, route.request.url):
+        route.abort()
+    else:
+        route.continue_()
+
+
+async def _handle_route_async(route: AsyncRoute):
+    """The asyncio counterpart of _handle_route."""
+    if should_block(route.request.resource_type, route.request.url):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+def block_resources(context: BrowserContext):
+    """
+    Aborts image, media, font and tracking requests of every page in the context.
+
+    Args:
+        context (BrowserContext): The Playwright browser context.
+    """
+    context.route("**/*", _handle_route)
+
+
+async def block_resources_async(context: AsyncBrowserContext):
+    """
+    The asyncio counterpart of block_resources.
+
+    Args:
+        context (AsyncBrowserContext): The Playwright browser context.
+    """
+    await context.route("**/*", _handle_route_async)
+
+
+class BrowserSession:
+    """
+    Keeps one browser, context and page alive across menu actions, so repeated
+    syncs skip the browser cold start. The context is created from the stored
+    Playwright storage state of the account.
+
+    Attributes:
+        restored (bool): True if the context was created from a stored session.
+        verified (bool): True once the session was checked to be logged in.
+    """
+
+    def __init__(
+        self,
+        account: model.Account,
+        lean=constants.LEAN_BROWSER,
+        speed_profile=constants.SPEED_PROFILE,
+    ):
+        self.account = account
+        self.lean = lean
+        self.speed_profile = speed_profile
+        self.restored = False
+        self.verified = False
+        self._playwright: Optional[Playwright] = None
+        self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
+        self.page: Optional[Page] = None
+
+    @property
+    def started(self) -> bool:
+        """Check if the browser is running and its page is still open."""
+        return (
+            self.page is not None
+            and self.browser.is_connected()
+            and not self.page.is_closed()
+        )
+
+    def start(self):
+        """Launches the browser and restores the session, unless it's already running."""
+        if self.started:
+            return
+
+        # The window may have been closed by hand since the previous action
+        self.close()
+
+        self._playwright = sync_playwright().start()
+        self.browser = self._playwright.chromium.launch(
+            **launch_options(self.lean, self.speed_profile)
+        )
+
+        # 1. Restore the session to not log in again
+        storage_state = auth.get_storage_state(self.account)
+        self.restored = storage_state is not None
+        self.context = self.browser.new_context(storage_state=storage_state)
+        if self.lean:
+            block_resources(self.context)
+
+        self.page = self.context.new_page()
+
+    def close(self):
+        """Shuts down the browser."""
+        if self.browser is not None:
+            self.browser.close()
+        if self._playwright is not None:
+            self._playwright.stop()
+
+        self._playwright = self.browser = self.context = self.page = None
+        self.restored = self.verified = False
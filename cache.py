@@ -2,18 +2,21 @@
 This module provides classes for managing a cache of followers and followings
 using JSON files. It includes a SetBuffer class for storing unique items in a set
 and a FollowerCache class for handling the serialization and deserialization of
-follower data to and from a JSON file.
+follower data to and from a JSON file, optionally backed by an append-only journal.
 """
 
 import json
 from pathlib import Path
 
+from utils.file_utils import atomic_write_text
+
 
 class SetBuffer:
-    """A buffer that stores unique items in a set."""
+    """A buffer that stores unique items in a set and remembers unsaved changes."""
 
     def __init__(self):
         self.storage = set()
+        self.changes = []
 
     def __len__(self):
         return len(self.storage)
@@ -23,7 +26,15 @@ class SetBuffer:
 
     def add(self, value):
         """Add a value to the buffer."""
-        self.storage.add(value)
+        if value not in self.storage:
+            self.storage.add(value)
+            self.changes.append(("+", value))
+
+    def discard(self, value):
+        """Remove a value from the buffer if it is present."""
+        if value in self.storage:
+            self.storage.remove(value)
+            self.changes.append(("-", value))
 
     def contains(self, key):
         """Check if a key is in the buffer."""
@@ -33,25 +44,81 @@ class SetBuffer:
         """Get the buffer contents as a list."""
         return list(self.storage)
 
+    def drain_changes(self):
+        """Return the changes made since the previous call as (op, value) pairs."""
+        changes, self.changes = self.changes, []
+        return changes
 
-class FollowerCache:
-    """A cache that stores followers and followings in a JSON file."""
 
-    def __init__(self, file_path: str, preload: bool = True):
-        if not file_path.endswith(".json"):
-            file_path = f"{file_path}.json"
+class FollowerCache:
+    """
+    A cache that stores followers and followings in a JSON file.
+
+    In journaled mode every save appends only the changed names to a journal file
+    next to the JSON snapshot, the snapshot is rewritten once the journal grows
+    past `compact_every` entries.
+    """
+
+    # The extensions of the snapshot file and of the journal next to it.
+    suffix = ".json"
+    journal_suffix = ".journal.jsonl"
+
+    def __init__(
+        self,
+        file_path: str,
+        preload: bool = True,
+        journaled: bool = False,
+        compact_every: int = 5000,
+    ):
+        if not file_path.endswith(self.suffix):
+            file_path = f"{file_path}{self.suffix}"
 
         self.file = Path(file_path)
+        self.journal = self.file.with_suffix(self.journal_suffix)
+        self.journaled = journaled
+        self.compact_every = compact_every
+        self.journal_size = 0
         self.followers = SetBuffer()
         self.followings = SetBuffer()
 
         if preload:
             self.load_cache()
 
+    def begin_snapshot(self):
+        """Start a new sync. The JSON cache keeps no history, so there is nothing to do."""
+
     def save(self):
         """Save the current state to the file."""
-        self.ensure_file_exists()
-        self.file.write_text(self.serialize())
+        if not self.journaled:
+            self.compact()
+            return
+
+        lines = [
+            json.dumps([list_name, op, name])
+            for list_name, buffer in self._buffers()
+            for op, name in buffer.drain_changes()
+        ]
+
+        if lines:
+            self.ensure_file_exists()
+            with self.journal.open("a", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n")
+            self.journal_size += len(lines)
+
+        if self.journal_size >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Write the full state to the snapshot file and drop the journal."""
+        for _, buffer in self._buffers():
+            buffer.drain_changes()
+
+        atomic_write_text(self.file, self.serialize())
+
+        # The snapshot already includes everything, replaying the journal on top
+        # of it is harmless if we crash before it's removed.
+        self.journal.unlink(missing_ok=True)
+        self.journal_size = 0
 
     def serialize(self):
         """Serialize the buffer contents to a JSON string."""
@@ -63,7 +130,7 @@ class FollowerCache:
         )
 
     def load_cache(self):
-        """Load the cache from the file."""
+        """Load the cache from the snapshot file, then replay the journal."""
         self.ensure_file_exists()
 
         try:
@@ -87,8 +154,90 @@ class FollowerCache:
             self.followers = SetBuffer()
             self.followings = SetBuffer()
 
+        self.replay_journal()
+
+        for _, buffer in self._buffers():
+            buffer.drain_changes()
+
+    def replay_journal(self):
+        """Apply the changes recorded in the journal on top of the loaded snapshot."""
+        self.journal_size = 0
+        if not self.journal.exists():
+            return
+
+        with self.journal.open("rb+") as file:
+            data = file.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                # A crash mid-write left the last line truncated, drop it so the
+                # next save doesn't append its first change to the fragment
+                file.truncate(end)
+
+        buffers = dict(self._buffers())
+        for line in data[:end].splitlines():
+            try:
+                list_name, op, name = json.loads(line)
+            except (json.decoder.JSONDecodeError, ValueError):
+                continue
+
+            buffer = buffers.get(list_name)
+            if buffer is None:
+                continue
+
+            if op == "+":
+                buffer.add(name)
+            elif op == "-":
+                buffer.discard(name)
+
+            self.journal_size += 1
+
+    def clear(self):
+        """Remove all followers and followings from the cache and the disk."""
+        self.followers = SetBuffer()
+        self.followings = SetBuffer()
+        self.compact()
+
     def ensure_file_exists(self):
         """Ensure the cache file exists, creating it if necessary."""
         if not self.file.exists():
             self.file.parent.mkdir(parents=True, exist_ok=True)
             self.file.touch()
+
+    def _buffers(self):
+        """Return the (list name, buffer) pairs of the cache."""
+        return [("followers", self.followers), ("followings", self.followings)]
+
+
+def open_cache(file_path: str, backend: str = "json"):
+    """
+    Opens the follower cache stored under the given path.
+
+    Args:
+        file_path (str): The path of the cache without extension.
+        backend (str): "json" rewrites one JSON file on every save,
+            "journal" appends changes to a journal and compacts periodically,
+            "sqlite" keeps every sync as a snapshot in a SQLite database,
+            "binary" memory-maps a sorted binary snapshot and journals changes.
+
+    Raises:
+        ValueError: If the backend is unknown.
+
+    Returns:
+        FollowerCache | SQLiteFollowerCache | BinaryFollowerCache: The loaded cache.
+    """
+    if backend == "json":
+        return FollowerCache(file_path, preload=True)
+    if backend == "journal":
+        return FollowerCache(file_path, preload=True, journaled=True)
+    if backend == "sqlite":
+        # Imported here, sqlite_cache depends on this module
+        from sqlite_cache import SQLiteFollowerCache
+
+        return SQLiteFollowerCache(file_path, preload=True)
+    if backend == "binary":
+        # Imported here, snapshot_file depends on this module
+        from snapshot_file import BinaryFollowerCache
+
+        return BinaryFollowerCache(file_path, preload=True)
+
+    raise ValueError(f"Unknown cache backend '{backend}'")
@@ -0,0 +1,129 @@
+"""
+This module persists how far the extraction of each list got, so a scrape that
+died partway (rate limit, crash, Ctrl-C) resumes near where it stopped instead
+of scrolling the dialog from the first row again.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from utils.file_utils import atomic_write_text
+
+# Instagram's pagination cursors go stale, older checkpoints are ignored.
+MAX_AGE = timedelta(hours=12)
+
+
+class Checkpoint(NamedTuple):
+    """
+    The position of an unfinished list extraction.
+
+    Attributes:
+        list_name (str): Either "followers" or "followings".
+        rows (int): The number of rows read from the dialog so far.
+        last_user (Optional[str]): The last username read.
+        cursor (Optional[str]): The pagination cursor of the next page, known
+            when names are read from the API responses.
+        user_id (Optional[str]): The id of the profile owner in the API URLs.
+        saved_at (str): When the checkpoint was saved, as an ISO timestamp.
+    """
+
+    list_name: str
+    rows: int
+    last_user: Optional[str] = None
+    cursor: Optional[str] = None
+    user_id: Optional[str] = None
+    saved_at: str = ""
+
+    @property
+    def age(self) -> timedelta:
+        """How long ago the checkpoint was saved."""
+        return datetime.now(timezone.utc) - datetime.fromisoformat(self.saved_at)
+
+    @property
+    def can_replay(self) -> bool:
+        """Check if the extraction can continue straight from the API cursor."""
+        return bool(self.cursor and self.user_id)
+
+
+class CheckpointStore:
+    """
+    Keeps the checkpoints of the lists of an account in a JSON file next to its cache.
+    The file is read once, later reads are served from memory.
+    """
+
+    def __init__(self, file_path: str):
+        if not file_path.endswith(".checkpoint.json"):
+            file_path = f"{file_path}.checkpoint.json"
+
+        self.file = Path(file_path)
+        self._data: Optional[dict] = None
+
+    def load(self, list_name: str) -> Optional[Checkpoint]:
+        """
+        Returns the checkpoint of a list, unless there is none or it is too old.
+
+        Args:
+            list_name (str): Either "followers" or "followings".
+
+        Returns:
+            Optional[Checkpoint]: The checkpoint.
+        """
+        data = self._read().get(list_name)
+        if data is None:
+            return None
+
+        try:
+            checkpoint = Checkpoint(**data)
+            fresh = checkpoint.age <= MAX_AGE
+        except (TypeError, ValueError):
+            return None
+
+        return checkpoint if fresh else None
+
+    def save(self, checkpoint: Checkpoint):
+        """
+        Stores the checkpoint of a list, stamped with the current time.
+
+        Args:
+            checkpoint (Checkpoint): The position of the extraction.
+        """
+        checkpoint = checkpoint._replace(
+            saved_at=datetime.now(timezone.utc).isoformat(timespec="seconds")
+        )
+        data = self._read()
+        data[checkpoint.list_name] = checkpoint._asdict()
+        atomic_write_text(self.file, json.dumps(data))
+
+    def clear(self, list_name: Optional[str] = None):
+        """
+        Removes the checkpoint of a finished list, or of all lists.
+
+        Args:
+            list_name (Optional[str]): Either "followers" or "followings", all by default.
+        """
+        if list_name is None:
+            self._data = {}
+            self.file.unlink(missing_ok=True)
+            return
+
+        data = self._read()
+        if list_name not in data:
+            return
+
+        del data[list_name]
+        if data:
+            atomic_write_text(self.file, json.dumps(data))
+        else:
+            self.file.unlink(missing_ok=True)
+
+    def _read(self) -> dict:
+        """Return the stored checkpoints by list name, the file is read only once."""
+        if self._data is None:
+            try:
+                with open(self.file, "r", encoding="utf-8") as file:
+                    self._data = json.load(file)
+            except (OSError, json.JSONDecodeError):
+                self._data = {}
+        return self._data
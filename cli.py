@@ -1,11 +1,13 @@
 """
 This module provides CLI-related functions for the Follower Lens application.
 It includes functions for printing an introduction, prompting for user credentials,
-and clearing the console.
+browsing follower statistics page by page, and clearing the console.
 """
 
+import math
 import os
 import re
+from datetime import datetime
 
 import inquirer
 from inquirer.themes import BlueComposure
@@ -13,6 +15,9 @@ from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 
+import constants
+from console import print_followers_stats
+from export import stats_categories, stream_followers_stats
 from model import Account
 
 console = Console()
@@ -141,6 +146,134 @@ def get_credentials(account: Account):
     account.save_credentials(username=username, email=email, password=password)
 
 
+class _Pages:
+    """
+    Pages over the positions of the shown users. Positions are read from the
+    records only as far as the furthest page visited so far.
+    """
+
+    def __init__(self, positions, page_size: int):
+        self.positions = positions
+        self.page_size = page_size
+        self.seen: list[int] = []
+
+    def get(self, page: int) -> list[int]:
+        """Return the positions of the users on a page, counting from 1."""
+        end = page * self.page_size
+        while len(self.seen) < end:
+            position = next(self.positions, None)
+            if position is None:
+                break
+            self.seen.append(position)
+        return self.seen[end - self.page_size : end]
+
+
+def ask_for_page(total_pages: int) -> int:
+    """
+    Prompts the user to enter a page number.
+
+    Args:
+        total_pages (int): The number of pages.
+
+    Returns:
+        int: The entered page number.
+    """
+    questions = [
+        inquirer.Text(
+            "page",
+            message=f"Go to page (1-{total_pages})",
+            validate=lambda _, value: value.isdigit()
+            and 1 <= int(value) <= total_pages,
+        )
+    ]
+    answers = inquirer.prompt(questions, theme=BlueComposure())
+    return int(answers["page"])
+
+
+def browse_followers_stats(
+    insights,
+    include_haters=True,
+    include_ghosts=True,
+    page_size=constants.STATS_PAGE_SIZE,
+):
+    """
+    Shows follower statistics one page at a time with next/previous/jump controls.
+    Only the visible page is rendered. When the output is not a terminal, the rows
+    are streamed instead.
+
+    Args:
+        insights (analyzer.InsightRecords): The insights on all users.
+        include_haters (bool): Whether to include haters.
+        include_ghosts (bool): Whether to include ghosts.
+        page_size (int): The number of users per page.
+    """
+    if not console.is_terminal:
+        stream_followers_stats(insights, include_haters, include_ghosts)
+        return
+
+    categories = stats_categories(include_haters, include_ghosts)
+    total = insights.count(*categories)
+    total_pages = max(1, math.ceil(total / page_size))
+    pages = _Pages(insights.positions(*categories), page_size)
+
+    page = 1
+    while True:
+        print_followers_stats(
+            insights,
+            include_haters,
+            include_ghosts,
+            records=map(insights.record, pages.get(page)),
+            first_index=(page - 1) * page_size + 1,
+            caption=f"Page {page} of {total_pages} ({total} users)",
+        )
+
+        if total_pages == 1:
+            return
+
+        choices = []
+        if page < total_pages:
+            choices.append(("Next page", "next"))
+        if page > 1:
+            choices.append(("Previous page", "prev"))
+        choices += [("Jump to page", "jump"), ("Back to menu", "back")]
+
+        questions = [inquirer.List("page", message="📄 Navigate", choices=choices)]
+        answers = inquirer.prompt(questions, theme=BlueComposure())
+
+        match answers["page"]:
+            case "next":
+                page += 1
+            case "prev":
+                page -= 1
+            case "jump":
+                page = ask_for_page(total_pages)
+            case _:
+                return
+
+
+def ask_for_export() -> tuple[str, str]:
+    """
+    Prompts the user for what to export and where.
+
+    Returns:
+        tuple[str, str]: The category and the path of the export file.
+    """
+    questions = [
+        inquirer.List(
+            "category",
+            message="Which users to export",
+            choices=["all", "haters", "ghosts", "mutuals"],
+        ),
+        inquirer.List("format", message="File format", choices=["csv", "jsonl"]),
+        inquirer.List("gzip", message="Compress with gzip?", choices=["no", "yes"]),
+    ]
+    answers = inquirer.prompt(questions, theme=BlueComposure())
+
+    extension = answers["format"] + (".gz" if answers["gzip"] == "yes" else "")
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return answers["category"], f"exports/{answers['category']}-{timestamp}.{extension}"
+
+
 def clear():
     """
     Clears the console.
@@ -1,6 +1,6 @@
 # Define all the __all_ variable
-__all__ = ["is_homepage", "extract_followers"]
+__all__ = ["is_homepage", "extract_followers", "extract_followers_and_followings"]
 
 # Import the submodules
 from .home import is_homepage
-from .profile import extract_followers
+from .profile import extract_followers, extract_followers_and_followings
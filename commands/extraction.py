@@ -0,0 +1,410 @@
+"""
+This module provides the state of a list extraction that does not depend on how
+the browser is driven: cycle bookkeeping, when to stop, how new names are added
+to the cache, delta sync, reconciliation and checkpoints. The sync
+commands.profile.ListExtraction and the asyncio async_engine.AsyncListExtraction
+only add the browser I/O on top of it.
+"""
+
+import math
+import re
+import time
+from typing import Optional
+
+import constants
+from cache import FollowerCache
+from checkpoint import Checkpoint, CheckpointStore
+from commands.harvest import DialogHarvester
+from commands.network import FollowerResponseCollector, RateLimitWatcher
+from commands.pacing import SpeedProfile, get_speed_profile
+from metrics import ScrapeMetrics, StepTiming
+from scheduler import RequestScheduler
+
+
+class ListExtractionState:
+    """
+    The engine-independent state of the extraction of the followers or followings
+    of a profile, advanced one scroll cycle at a time.
+
+    Attributes:
+        expected_count (int): The number of users shown on the profile header.
+        max_cycles (int): The maximum number of scroll cycles to do.
+        cycles (int): The number of cycles done so far.
+        finished (bool): True once there is nothing left to extract.
+        last_step (Optional[StepTiming]): The timings of the latest cycle.
+        rows (int): The number of rows read so far, including resumed ones.
+        last_user (Optional[str]): The last username read.
+        replaying (bool): True when pages are requested from a saved API cursor
+            instead of scrolling the dialog.
+        delta (bool): True while the extraction stops at the first run of
+            already cached names, see take_names.
+        seen (set[str]): The names read by this extraction.
+        known_streak (int): The number of already cached names read in a row.
+        unsaved_checkpoint (Optional[Checkpoint]): The latest position that
+            save_checkpoint didn't write yet, see flush_checkpoint.
+        dropped_checkpoint (bool): True once the checkpoint the extraction
+            resumed from turned out to be unusable, see start_over.
+    """
+
+    extraction_page_size = 12
+
+    def __init__(
+        self,
+        repo: FollowerCache,
+        my_followers=True,
+        source=constants.SCRAPE_SOURCE,
+        speed_profile=constants.SPEED_PROFILE,
+        metrics: Optional[ScrapeMetrics] = None,
+        resume_from: Optional[Checkpoint] = None,
+        delta=constants.DELTA_SYNC,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
+        self.my_followers = my_followers
+        self.resume_from = resume_from
+        self.list_name = "followers" if my_followers else "followings"
+        self.collection = repo.followers if my_followers else repo.followings
+        self.metrics = metrics or ScrapeMetrics()
+        self.scheduler = scheduler or RequestScheduler()
+        self.speed_profile: SpeedProfile = get_speed_profile(speed_profile)
+        self.harvester = DialogHarvester()
+        self.collector = None
+        if source == "network":
+            self.collector = FollowerResponseCollector(my_followers)
+        self.rate_limits = RateLimitWatcher(my_followers)
+
+        self.expected_count = 0
+        self.max_cycles = 0
+        self.cycles = 0
+        self.finished = False
+        self.last_step: Optional[StepTiming] = None
+        self.rows = 0
+        self.last_user: Optional[str] = None
+        self.replaying = False
+        self.delta = delta
+        self.reached_known_names = False
+        self.seen: set[str] = set()
+        self.known_streak = 0
+        self.unsaved_checkpoint: Optional[Checkpoint] = None
+        self.dropped_checkpoint = False
+
+    @staticmethod
+    def parse_count(text: str) -> int:
+        """Parse the number of users out of the text of a profile header link."""
+        followers_count = "".join(re.findall(r"\d+", text))
+        return int(followers_count) if followers_count else 0
+
+    @classmethod
+    def count_cycles(cls, count: int) -> int:
+        """Return the maximum number of scroll cycles needed to load `count` users."""
+        return math.ceil(count / cls.extraction_page_size)
+
+    @property
+    def listener(self) -> RateLimitWatcher:
+        """The watcher of the API responses of the list, the collector if there is one."""
+        return self.collector if self.collector is not None else self.rate_limits
+
+    @property
+    def header_link(self) -> str:
+        """The selector of the profile header link that opens the dialog."""
+        btn_text = "followers" if self.my_followers else "following"
+        return f"header ul [role=link]:has-text('{btn_text}')"
+
+    def configure(self, header_text: str):
+        """
+        Sets up the extraction from the text of the profile header link and
+        continues from the checkpoint to resume from, if any.
+
+        Args:
+            header_text (str): The text of the link, e.g. "1,204 followers".
+        """
+        btn_text = "followers" if self.my_followers else "following"
+        self.expected_count = self.parse_count(header_text)
+        self.max_cycles = self.count_cycles(self.expected_count)
+        print(
+            f"Detected {self.expected_count} {btn_text}. Will do max {self.max_cycles} cycles"
+        )
+
+        checkpoint = self.resume_from
+        if checkpoint is None:
+            return
+
+        print(
+            f"Resuming {self.list_name} after {checkpoint.rows} rows "
+            f"saved at {checkpoint.saved_at}"
+        )
+        self.rows, self.last_user = checkpoint.rows, checkpoint.last_user
+        self.cycles = self.count_cycles(checkpoint.rows)
+
+        if self.collector is not None and checkpoint.can_replay:
+            # Continue from the saved cursor, the dialog is not needed at all
+            self.collector.restore(checkpoint.user_id, checkpoint.cursor)
+            self.replaying = True
+
+    @property
+    def needs_fast_forward(self) -> bool:
+        """Check if the dialog must be scrolled back to the resumed row, see fast_forwarded."""
+        return self.resume_from is not None and self.collector is None
+
+    def fast_forwarded(self, loaded: int):
+        """
+        Continues after the dialog was scrolled back to the resumed row. The
+        last page before that position is read again to not miss anyone.
+
+        Args:
+            loaded (int): The number of rows the dialog holds.
+        """
+        rows = self.resume_from.rows
+        self.harvester.consumed = max(0, min(loaded, rows) - self.extraction_page_size)
+        self.rows = self.harvester.consumed
+        self.cycles = self.count_cycles(self.rows)
+
+    @property
+    def should_start_over(self) -> bool:
+        """
+        Check if a resumed extraction got nothing from its saved position, e.g.
+        because Instagram refused the saved cursor, and must read the list from
+        its top instead, see start_over.
+        """
+        return (
+            self.resume_from is not None
+            and not self.seen
+            and (self.replaying or self.collector is None)
+        )
+
+    def start_over(self):
+        """
+        Forgets the checkpoint the extraction resumed from and continues from the
+        top of the list. The checkpoint is removed by the next flush_checkpoint,
+        unless a new position replaces it.
+        """
+        print(f"Can't resume {self.list_name}, reading the list from the top")
+        self.resume_from = None
+        self.dropped_checkpoint = True
+        self.rows, self.last_user = 0, None
+        self.cycles = 1
+        self.harvester.consumed = 0
+        if self.collector is not None:
+            self.collector = FollowerResponseCollector(self.my_followers)
+        self.replaying = False
+
+    def begin_cycle(self) -> bool:
+        """
+        Starts the next cycle, unless the extraction is finished.
+
+        Returns:
+            bool: True if the next page should be read.
+        """
+        # In cache we have exactly same number of followers
+        # as user has at this moment, no need to fetch follower names again.
+        # A delta sync reads the newest names anyway, the count can't tell if
+        # one user left and another one came.
+        if self.cycles >= self.max_cycles or (
+            not self.delta and self.expected_count == len(self.collection)
+        ):
+            self.finished = True
+
+        if self.finished:
+            return False
+
+        self.cycles += 1
+        return True
+
+    def take_names(self, names: list[str], start: float, settled: float) -> bool:
+        """
+        Adds the names read in this cycle to the cache.
+
+        Args:
+            names (list[str]): The names loaded since the previous cycle.
+            start (float): The perf_counter() value when the cycle started waiting.
+            settled (float): The perf_counter() value when the page settled.
+
+        Returns:
+            bool: True if new names were added, False if the extraction is finished.
+        """
+        # If after scrolling no new rows or pages arrived,
+        # then no more followers left to analyze
+        if not names:
+            self.finished = True
+            return False
+
+        known = len(self.collection)
+        for name in names:
+            if self.collection.contains(name):
+                self.known_streak += 1
+            else:
+                self.known_streak = 0
+            self.collection.add(name)
+            self.seen.add(name)
+        self.rows += len(names)
+        self.last_user = names[-1]
+
+        if self.delta and self.known_streak >= constants.DELTA_SYNC_STOP_AFTER:
+            self.reach_known_names()
+
+        self.last_step = StepTiming(
+            settle_seconds=settled - start,
+            harvest_seconds=time.perf_counter() - settled,
+            new_names=len(self.collection) - known,
+            names_read=len(names),
+        )
+        return True
+
+    def reach_known_names(self):
+        """
+        Stops a delta sync once the dialog, which lists the newest users first,
+        only shows cached names. If the cache then holds as many users as the
+        profile header, nobody left and the extraction is done. Otherwise the
+        whole list is read to find out who left, see reconcile.
+        """
+        missing = self.expected_count - len(self.collection)
+        if missing >= 0 and self.covers_list(len(self.collection)):
+            print(f"Reached already known {self.list_name}, stopping early")
+            self.reached_known_names = True
+            self.finished = True
+            return
+
+        print(
+            f"{abs(missing)} {self.list_name} differ from the cache, "
+            "reading the whole list"
+        )
+        self.delta = False
+
+    def covers_list(self, count: int) -> bool:
+        """
+        Check if `count` users are all the profile header counts. The header may
+        count a few deactivated users that the dialog never shows, up to
+        constants.DELTA_SYNC_HIDDEN_USERS missing names are tolerated.
+        """
+        return self.expected_count - count <= constants.DELTA_SYNC_HIDDEN_USERS
+
+    @property
+    def read_whole_list(self) -> bool:
+        """Check if this extraction read the list from its top to its bottom."""
+        if (
+            not self.finished
+            or self.reached_known_names
+            or self.resume_from is not None
+        ):
+            return False
+        if self.collector is not None and self.collector.exhausted:
+            return True
+        return self.covers_list(len(self.seen))
+
+    def reconcile(self) -> int:
+        """
+        Removes the users that are no longer in the list from the cache. Only
+        done once the whole list was read, a partial read can't tell who left.
+
+        Returns:
+            int: The number of users removed.
+        """
+        if not self.read_whole_list:
+            return 0
+
+        stale = [name for name in self.collection if name not in self.seen]
+        for name in stale:
+            self.collection.discard(name)
+
+        if stale:
+            print(f"Removed {len(stale)} {self.list_name} that are gone")
+        return len(stale)
+
+    def save(self, repo: FollowerCache):
+        """
+        Saves the cache and records the finished cycle in the metrics.
+
+        Args:
+            repo (FollowerCache): The cache object the names are stored in.
+        """
+        start = time.perf_counter()
+        repo.save()
+        self.record_cycle(time.perf_counter() - start)
+
+    def record_cycle(self, save_seconds: float):
+        """Records the latest cycle, together with the time the cache save took."""
+        self.metrics.record_cycle(
+            self.list_name, self.last_step, save_seconds, len(self.collection)
+        )
+
+    def should_scroll(self) -> bool:
+        """Check if the dialog must be scrolled to load the next page."""
+        if self.finished:
+            return False
+
+        if self.collector is not None and self.collector.exhausted:
+            self.finished = True
+            return False
+
+        # The next page is requested by the next cycle
+        return not self.replaying
+
+    @property
+    def complete(self) -> bool:
+        """Check if the whole list was read, rather than the extraction being cut short."""
+        if self.reached_known_names:
+            return True
+        if self.collector is not None and self.collector.exhausted:
+            return True
+        return self.covers_list(max(self.rows, len(self.collection)))
+
+    @property
+    def advanced(self) -> bool:
+        """Check if the extraction got past the checkpoint it resumed from."""
+        return self.resume_from is None or self.rows > self.resume_from.rows
+
+    def checkpoint(self) -> Checkpoint:
+        """Return the current position of the extraction."""
+        return Checkpoint(
+            list_name=self.list_name,
+            rows=self.rows,
+            last_user=self.last_user,
+            cursor=self.collector.next_cursor if self.collector else None,
+            user_id=self.collector.user_id if self.collector else None,
+        )
+
+    def save_checkpoint(self, checkpoints: Optional[CheckpointStore], force=False):
+        """
+        Stores the position of the extraction every constants.CHECKPOINT_EVERY
+        cycles, or removes it once the list is complete. Call it after the
+        cache is saved, the position must not run ahead of the stored names.
+        A position that didn't get past the resumed checkpoint is not stored,
+        so that checkpoint keeps its age and expires.
+
+        Args:
+            checkpoints (Optional[CheckpointStore]): The checkpoints of the account,
+                nothing is stored if None.
+            force (bool): Store the position whatever the cycle.
+        """
+        if checkpoints is None:
+            return
+
+        if self.finished and self.complete:
+            self.unsaved_checkpoint = None
+            checkpoints.clear(self.list_name)
+            return
+
+        if not self.advanced:
+            return
+
+        self.unsaved_checkpoint = self.checkpoint()
+        if force or self.cycles % constants.CHECKPOINT_EVERY == 0:
+            self.flush_checkpoint(checkpoints)
+
+    def flush_checkpoint(self, checkpoints: Optional[CheckpointStore]):
+        """
+        Writes the latest position save_checkpoint skipped, so an extraction
+        that is interrupted resumes from its last saved cycle. Removes the
+        checkpoint dropped by start_over if there is no newer position.
+
+        Args:
+            checkpoints (Optional[CheckpointStore]): The checkpoints of the account.
+        """
+        if checkpoints is None:
+            return
+
+        if self.unsaved_checkpoint is not None:
+            checkpoints.save(self.unsaved_checkpoint)
+        elif self.dropped_checkpoint:
+            checkpoints.clear(self.list_name)
+        self.unsaved_checkpoint = None
+        self.dropped_checkpoint = False
@@ -0,0 +1,57 @@
+"""
+This module provides an incremental harvester for the rows of the followers/following dialog.
+"""
+
+from playwright.sync_api import Page
+
+# Returns the text of every row appended after the first `start` rows.
+HARVEST_SCRIPT = """(start) => {
+    const rows = document.querySelectorAll('div[role=dialog] a[role=link] span');
+    const names = [];
+    for (let i = start; i < rows.length; i++) {
+        names.push(rows[i].textContent);
+    }
+    return names;
+}"""
+
+# Returns the number of rows the dialog holds.
+ROW_COUNT_SCRIPT = """() => {
+    return document.querySelectorAll('div[role=dialog] a[role=link] span').length;
+}"""
+
+
+class DialogHarvester:
+    """
+    Reads only the dialog rows that were appended since the previous harvest.
+
+    Attributes:
+        consumed (int): The number of rows already read from the dialog.
+    """
+
+    def __init__(self):
+        self.consumed = 0
+
+    def consume(self, names: list[str]) -> list[str]:
+        """
+        Registers a batch of newly read rows.
+
+        Args:
+            names (list[str]): The rows returned by HARVEST_SCRIPT.
+
+        Returns:
+            list[str]: The same rows.
+        """
+        self.consumed += len(names)
+        return names
+
+    def harvest(self, page: Page) -> list[str]:
+        """
+        Reads the new rows of the dialog in a single browser round trip.
+
+        Args:
+            page (Page): The Playwright page object.
+
+        Returns:
+            list[str]: The rows appended since the previous harvest.
+        """
+        return self.consume(page.evaluate(HARVEST_SCRIPT, self.consumed))
@@ -0,0 +1,263 @@
+"""
+This module provides functions for capturing followers and followings from the
+JSON responses Instagram loads while the followers/following dialog is scrolled.
+"""
+
+import json
+import re
+from typing import Optional, Union
+
+from playwright.async_api import Page as AsyncPage
+from playwright.async_api import Response as AsyncResponse
+from playwright.sync_api import Error, Page, Response
+
+import constants
+from auth import PROBE_HEADERS
+
+# Matches the paginated endpoint the followers/following dialog calls, e.g.
+# /api/v1/friendships/123/followers/?count=12&max_id=24
+FRIENDSHIPS_URL_PATTERN = re.compile(
+    r"/api/v1/friendships/(?P<user_id>\d+)/(?P<kind>followers|following)/"
+)
+
+
+def parse_usernames(payload: dict) -> list[str]:
+    """
+    Extracts usernames from a friendships API response.
+
+    Args:
+        payload (dict): The decoded JSON body of the response.
+
+    Returns:
+        list[str]: The usernames in the order they were returned.
+    """
+    users = payload.get("users") or []
+    return [user["username"] for user in users if user.get("username")]
+
+
+def parse_next_cursor(payload: dict) -> Optional[str]:
+    """
+    Extracts the pagination cursor of the next page from a friendships API response.
+
+    Args:
+        payload (dict): The decoded JSON body of the response.
+
+    Returns:
+        Optional[str]: The cursor of the next page, or None if this was the last page.
+    """
+    cursor = payload.get("next_max_id")
+    return str(cursor) if cursor else None
+
+
+class RateLimitWatcher:
+    """
+    Notes the friendships API responses of a single list that Instagram refuses
+    with a rate limit. Extractions that read names from the dialog only listen
+    for these, the page itself may not show any message.
+
+    Attributes:
+        kind (str): Either "followers" or "following".
+        throttled (bool): True once Instagram refused a page with a rate limit,
+            reset by take_throttled.
+    """
+
+    def __init__(self, my_followers=True):
+        self.kind = "followers" if my_followers else "following"
+        self.throttled = False
+        self._page: Optional[Union[Page, AsyncPage]] = None
+        self._listener = None
+
+    def matches(self, url: str) -> bool:
+        """Check if the URL belongs to the list this watcher is interested in."""
+        match = FRIENDSHIPS_URL_PATTERN.search(url)
+        return match is not None and match.group("kind") == self.kind
+
+    def take_throttled(self) -> bool:
+        """Check if a page was refused with a rate limit since the previous call."""
+        throttled, self.throttled = self.throttled, False
+        return throttled
+
+    def accept(self, response: Union[Response, AsyncResponse]) -> bool:
+        """
+        Check if a response is a page of this list that can be read, notes a
+        refused page with a rate limit, see take_throttled.
+
+        Args:
+            response (Union[Response, AsyncResponse]): The Playwright response object.
+
+        Returns:
+            bool: True if the body of the response should be fed.
+        """
+        if not self.matches(response.url):
+            return False
+
+        if not response.ok:
+            self.throttled = self.throttled or response.status == 429
+            return False
+
+        return True
+
+    def on_response(self, response: Response):
+        """
+        Playwright "response" event handler.
+
+        Args:
+            response (Response): The Playwright response object.
+        """
+        self.accept(response)
+
+    async def on_response_async(self, response: AsyncResponse):
+        """
+        The asyncio counterpart of on_response.
+
+        Args:
+            response (AsyncResponse): The Playwright response object.
+        """
+        self.accept(response)
+
+    def attach(self, page: Page):
+        """Start listening to the responses of the page."""
+        page.on("response", self.on_response)
+        self._page, self._listener = page, self.on_response
+
+    def attach_async(self, page: AsyncPage):
+        """Start listening to the responses of a page of the asyncio API."""
+        page.on("response", self.on_response_async)
+        self._page, self._listener = page, self.on_response_async
+
+    def detach(self, page: Union[Page, AsyncPage]):
+        """Stop listening to the responses of the page."""
+        if self._page is page:
+            page.remove_listener("response", self._listener)
+            self._page, self._listener = None, None
+
+
+class FollowerResponseCollector(RateLimitWatcher):
+    """
+    Collects usernames from the friendships API responses of a single list.
+
+    Attributes:
+        user_id (Optional[str]): The id of the profile owner, known after the first page.
+        next_cursor (Optional[str]): The cursor of the next page to be loaded.
+        pages (int): The number of pages received so far.
+        exhausted (bool): True once the last page has been received.
+    """
+
+    def __init__(self, my_followers=True):
+        super().__init__(my_followers)
+        self.user_id: Optional[str] = None
+        self.next_cursor: Optional[str] = None
+        self.pages = 0
+        self.exhausted = False
+        self._pending: list[str] = []
+
+    def feed(self, url: str, payload: dict) -> list[str]:
+        """
+        Consumes one page of results.
+
+        Args:
+            url (str): The URL the page was loaded from.
+            payload (dict): The decoded JSON body of the response.
+
+        Returns:
+            list[str]: The usernames found on this page.
+        """
+        match = FRIENDSHIPS_URL_PATTERN.search(url)
+        if match is not None:
+            self.user_id = match.group("user_id")
+
+        names = parse_usernames(payload)
+        self._pending.extend(names)
+
+        self.pages += 1
+        self.next_cursor = parse_next_cursor(payload)
+        self.exhausted = self.next_cursor is None
+
+        return names
+
+    def restore(self, user_id: str, cursor: str):
+        """
+        Continues a list from a saved pagination cursor, see fetch_next.
+
+        Args:
+            user_id (str): The id of the profile owner.
+            cursor (str): The cursor of the next page.
+        """
+        self.user_id = user_id
+        self.next_cursor = cursor
+        self.exhausted = False
+
+    def fetch_next(self, page: Page, count: int = 12) -> bool:
+        """
+        Requests the next page straight from the API with the cookies of the page,
+        without scrolling the dialog.
+
+        Args:
+            page (Page): The Playwright page object.
+            count (int): The number of users to ask for.
+
+        Returns:
+            bool: True if a page was received, False if the request failed,
+                e.g. because Instagram rate limits the account.
+        """
+        url = (
+            f"{constants.IG_BASE_URL}/api/v1/friendships/{self.user_id}/{self.kind}/"
+            f"?count={count}&max_id={self.next_cursor}"
+        )
+        response = page.context.request.get(
+            url, headers=PROBE_HEADERS, fail_on_status_code=False
+        )
+        if not response.ok:
+            self.throttled = self.throttled or response.status == 429
+            return False
+
+        try:
+            payload = response.json()
+        except (Error, json.decoder.JSONDecodeError):
+            return False
+
+        self.feed(url, payload)
+        return True
+
+    def on_response(self, response: Response):
+        """
+        Playwright "response" event handler.
+
+        Args:
+            response (Response): The Playwright response object.
+        """
+        if not self.accept(response):
+            return
+
+        try:
+            payload = response.json()
+        except (Error, json.decoder.JSONDecodeError):
+            return
+
+        self.feed(response.url, payload)
+
+    async def on_response_async(self, response: AsyncResponse):
+        """
+        The asyncio counterpart of on_response.
+
+        Args:
+            response (AsyncResponse): The Playwright response object.
+        """
+        if not self.accept(response):
+            return
+
+        try:
+            payload = await response.json()
+        except (Error, json.decoder.JSONDecodeError):
+            return
+
+        self.feed(response.url, payload)
+
+    def has_pending(self) -> bool:
+        """Check if usernames were received since the previous drain."""
+        return len(self._pending) > 0
+
+    def drain(self) -> list[str]:
+        """Return the usernames received since the previous call."""
+        names, self._pending = self._pending, []
+        return names
@@ -0,0 +1,168 @@
+"""
+This module provides the pacing engine that decides how long to wait after each
+scroll of the followers/following dialog.
+"""
+
+import time
+from typing import Callable, Iterator, NamedTuple
+
+from playwright.sync_api import Page
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+# Resolves once the dialog holds more than `consumed` rows.
+ROW_COUNT_GREW_SCRIPT = """(consumed) => {
+    return document.querySelectorAll('div[role=dialog] a[role=link] span').length > consumed;
+}"""
+
+
+class SpeedProfile(NamedTuple):
+    """
+    Timing settings for a scrape.
+
+    Attributes:
+        slow_mo (int): Delay in milliseconds Playwright adds to every browser action.
+        settle_timeout (int): Milliseconds to wait for a scroll to settle per attempt.
+        initial_backoff (float): Seconds to wait before the first retry.
+        max_attempts (int): How many times to wait for a scroll before giving up.
+    """
+
+    slow_mo: int
+    settle_timeout: int
+    initial_backoff: float
+    max_attempts: int
+
+
+SPEED_PROFILES = {
+    "careful": SpeedProfile(
+        slow_mo=300, settle_timeout=8000, initial_backoff=1.0, max_attempts=4
+    ),
+    "normal": SpeedProfile(
+        slow_mo=50, settle_timeout=5000, initial_backoff=0.5, max_attempts=3
+    ),
+    "fast": SpeedProfile(
+        slow_mo=0, settle_timeout=3000, initial_backoff=0.25, max_attempts=2
+    ),
+}
+
+
+def get_speed_profile(name: str) -> SpeedProfile:
+    """
+    Looks up a speed profile by name.
+
+    Args:
+        name (str): One of the keys of SPEED_PROFILES.
+
+    Raises:
+        ValueError: If there is no profile with such name.
+
+    Returns:
+        SpeedProfile: The speed profile.
+    """
+    if name not in SPEED_PROFILES:
+        raise ValueError(
+            f"Unknown speed profile '{name}', expected one of {list(SPEED_PROFILES)}"
+        )
+    return SPEED_PROFILES[name]
+
+
+def poll_intervals(settle_timeout: int, first: int = 50) -> Iterator[int]:
+    """
+    Yields the milliseconds to sleep between two checks of a condition, doubling
+    up to a second, until `settle_timeout` milliseconds are used up.
+
+    Args:
+        settle_timeout (int): The milliseconds to wait for in total.
+        first (int): The milliseconds to sleep after the first check.
+    """
+    waited, interval = 0, first
+    while waited < settle_timeout:
+        yield interval
+        waited += interval
+        interval = min(interval * 2, 1000)
+
+
+def retry_delays(profile: SpeedProfile) -> Iterator[float]:
+    """
+    Yields the seconds to sleep before each retry of a failed attempt, doubling
+    from `initial_backoff` until `max_attempts` attempts are made.
+
+    Args:
+        profile (SpeedProfile): The speed profile of the scrape.
+    """
+    delay = profile.initial_backoff
+    for _ in range(profile.max_attempts - 1):
+        yield delay
+        delay *= 2
+
+
+class ScrollPacer:
+    """
+    Waits for a scroll to settle instead of sleeping for a fixed amount of time.
+    Each attempt waits up to `settle_timeout`, failed attempts are retried with
+    exponential backoff.
+    """
+
+    poll_interval = 50  # Milliseconds
+
+    def __init__(self, profile: SpeedProfile):
+        self.profile = profile
+
+    def wait_for_rows(self, page: Page, consumed: int) -> bool:
+        """
+        Waits until the dialog has more rows than were already consumed.
+
+        Args:
+            page (Page): The Playwright page object.
+            consumed (int): The number of rows already read from the dialog.
+
+        Returns:
+            bool: True if new rows appeared, False if the wait timed out.
+        """
+
+        def rows_grew():
+            try:
+                page.wait_for_function(
+                    ROW_COUNT_GREW_SCRIPT,
+                    arg=consumed,
+                    timeout=self.profile.settle_timeout,
+                    polling="raf",
+                )
+                return True
+            except PlaywrightTimeoutError:
+                return False
+
+        return self._retry(rows_grew)
+
+    def wait_until(self, page: Page, condition: Callable[[], bool]) -> bool:
+        """
+        Waits until a Python-side condition holds, e.g. until a network response
+        has been received. Keeps Playwright's event loop running while polling.
+
+        Args:
+            page (Page): The Playwright page object.
+            condition (Callable[[], bool]): The condition to wait for.
+
+        Returns:
+            bool: True if the condition was met, False if the wait timed out.
+        """
+
+        def condition_met():
+            for interval in poll_intervals(
+                self.profile.settle_timeout, self.poll_interval
+            ):
+                if condition():
+                    return True
+                page.wait_for_timeout(interval)
+            return condition()
+
+        return self._retry(condition_met)
+
+    def _retry(self, attempt: Callable[[], bool]) -> bool:
+        """Run an attempt until it succeeds, backing off exponentially between tries."""
+        if attempt():
+            return True
+        for delay in retry_delays(self.profile):
+            time.sleep(delay)
+            if attempt():
+                return True
+        return False
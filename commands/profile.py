@@ -2,71 +2,373 @@
 This module provides functions for extracting followers and followings from an Instagram profile.
 """
 
-import math
-import re
 import time
+from typing import Optional
 
 from playwright.sync_api import Page
 
+import constants
 from cache import FollowerCache
+from checkpoint import Checkpoint, CheckpointStore
+from commands.extraction import ListExtractionState
+from commands.harvest import ROW_COUNT_SCRIPT
+from commands.pacing import ScrollPacer
+from metrics import ScrapeMetrics
+from scheduler import THROTTLE_SCRIPT, RequestScheduler
 
+# Scrolls the followers list to its bottom so that the next page gets loaded.
+SCROLL_SCRIPT = """() => {
+    const list = document.querySelector('[role=dialog] [style*="overflow: hidden auto;"]').parentElement;
+    list.scrollTo({top: list.scrollHeight, behavior: "smooth"});
+}"""
 
-def extract_followers(page: Page, repo: FollowerCache, my_followers=True):
+# Scrolls the followers list up a bit and back to its bottom, so that a page
+# that failed to load is requested again.
+RESCROLL_SCRIPT = """() => {
+    const list = document.querySelector('[role=dialog] [style*="overflow: hidden auto;"]').parentElement;
+    list.scrollTo({top: Math.max(0, list.scrollHeight - 2 * list.clientHeight)});
+    list.scrollTo({top: list.scrollHeight, behavior: "smooth"});
+}"""
+
+
+class ListExtraction(ListExtractionState):
+    """
+    Extracts the followers or followings of a profile one scroll cycle at a time,
+    so that several lists can be advanced in turns. Only drives the page, the
+    state of the extraction is kept by ListExtractionState.
+    """
+
+    def __init__(
+        self,
+        page: Page,
+        repo: FollowerCache,
+        my_followers=True,
+        source=constants.SCRAPE_SOURCE,
+        speed_profile=constants.SPEED_PROFILE,
+        metrics: Optional[ScrapeMetrics] = None,
+        resume_from: Optional[Checkpoint] = None,
+        delta=constants.DELTA_SYNC,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
+        super().__init__(
+            repo,
+            my_followers,
+            source,
+            speed_profile,
+            metrics,
+            resume_from,
+            delta,
+            scheduler,
+        )
+        self.page = page
+        self.pacer = ScrollPacer(self.speed_profile)
+
+    def open(self):
+        """Reads the number of users from the profile header and opens the dialog."""
+        with self.metrics.phase(f"open_{self.list_name}_dialog"):
+            self._open()
+
+    def _open(self):
+        """Opens the dialog, see open."""
+        # Open popup of people user follows
+        following_link = self.page.locator(self.header_link)
+        self.configure(following_link.text_content())
+        if self.replaying:
+            return
+
+        # Must listen before the click, the first page is loaded right away
+        self.listener.attach(self.page)
+
+        following_link.click()
+
+        if self.needs_fast_forward:
+            self.fast_forward(self.resume_from.rows)
+
+    def fast_forward(self, rows: int):
+        """
+        Scrolls the dialog until it holds `rows` rows, without reading them.
+
+        Args:
+            rows (int): The number of rows read before the extraction was interrupted.
+        """
+        loaded = self.page.evaluate(ROW_COUNT_SCRIPT)
+        while loaded < rows:
+            self.scheduler.pace()
+            self.page.evaluate(SCROLL_SCRIPT)
+            if not self.pacer.wait_for_rows(self.page, loaded):
+                break
+            loaded = self.page.evaluate(ROW_COUNT_SCRIPT)
+
+        self.fast_forwarded(loaded)
+
+    def step(self) -> bool:
+        """
+        Waits for the previous scroll to settle and adds the new names to the cache.
+
+        Returns:
+            bool: True if new names were added, False if the extraction is finished.
+        """
+        if not self.begin_cycle():
+            return False
+
+        start, settled, names = self._load_page()
+
+        # A resumed list that gets nothing from its saved position, e.g. because
+        # Instagram refused the saved cursor, is read from the top instead
+        if not names and self.should_start_over:
+            self.start_over()
+            self._reopen()
+            start, settled, names = self._load_page()
+
+        return self.take_names(names, start, settled)
+
+    def _load_page(self) -> tuple[float, float, list[str]]:
+        """
+        Waits for the next page of results and reads it.
+
+        Returns:
+            tuple[float, float, list[str]]: The perf_counter() values when the wait
+                started and when the page settled, and the names of the page.
+        """
+        # Wait for the previous scroll to load the next page of results
+        start = time.perf_counter()
+        self._wait_for_page()
+        settled = time.perf_counter()
+        names = self._read_page()
+
+        # No new names may as well mean that Instagram throttles the account,
+        # back off and ask for the page again. Raises Throttled if it persists.
+        attempt = 0
+        while not names and self.is_throttled():
+            with self.metrics.phase("throttle_backoff"):
+                self.scheduler.back_off(attempt)
+            attempt += 1
+
+            start = time.perf_counter()
+            self._request_page_again()
+            self._wait_for_page()
+            settled = time.perf_counter()
+            names = self._read_page()
+
+        return start, settled, names
+
+    def _reopen(self):
+        """Opens the dialog after start_over, unless it is open already."""
+        if self.collector is None:
+            # The rows of the dialog are read again from its first one
+            return
+
+        self.collector.attach(self.page)
+        self.page.locator(self.header_link).click()
+
+    def _wait_for_page(self):
+        """Waits for the previous scroll to load the next page of results."""
+        if self.replaying:
+            self.scheduler.pace()
+            self.collector.fetch_next(self.page, self.extraction_page_size)
+        elif self.collector is not None:
+            self.pacer.wait_until(self.page, self.collector.has_pending)
+        else:
+            self.pacer.wait_for_rows(self.page, self.harvester.consumed)
+
+    def _read_page(self) -> list[str]:
+        """Returns the names loaded since the previous cycle."""
+        if self.collector is not None:
+            return self.collector.drain()
+        return self.harvester.harvest(self.page)
+
+    def _request_page_again(self):
+        """Makes the dialog load the page that failed once more."""
+        # A replayed page is simply fetched again by _wait_for_page
+        if not self.replaying:
+            self.scheduler.pace()
+            self.page.evaluate(RESCROLL_SCRIPT)
+
+    def is_throttled(self) -> bool:
+        """Check if Instagram refused to load a page or shows a throttling message."""
+        if self.listener.take_throttled():
+            return True
+        return bool(self.page.evaluate(THROTTLE_SCRIPT))
+
+    def scroll(self):
+        """Scrolls the dialog to load the next page, unless the last one is loaded."""
+        if not self.should_scroll():
+            return
+
+        self.scheduler.pace()
+        self.page.evaluate(SCROLL_SCRIPT)
+
+    def close(self):
+        """Stops listening to the page."""
+        self.listener.detach(self.page)
+
+
+def extract_followers(
+    page: Page,
+    repo: FollowerCache,
+    my_followers=True,
+    source=constants.SCRAPE_SOURCE,
+    speed_profile=constants.SPEED_PROFILE,
+    metrics: Optional[ScrapeMetrics] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+    delta=constants.DELTA_SYNC,
+    scheduler: Optional[RequestScheduler] = None,
+):
     """
     Extracts followers or followings from an Instagram profile and stores them in a cache.
+    With checkpoints, the position is saved after every cycle and an interrupted
+    extraction continues from there.
 
     Args:
         page (Page): The Playwright page object.
         repo (FollowerCache): The cache object to store followers or followings.
         my_followers (bool): If True, extracts followers; otherwise, extracts followings.
+        source (str): "dom" reads names from the dialog, "network" parses them
+            from the API responses the dialog loads.
+        speed_profile (str): The name of the speed profile used to pace the scrolling.
+        metrics (Optional[ScrapeMetrics]): Records the timing of every cycle.
+        checkpoints (Optional[CheckpointStore]): Where to save and resume the position.
+        delta (bool): Stop once the newest names are already cached, see
+            ListExtraction.reach_known_names.
+        scheduler (Optional[RequestScheduler]): Paces the scrolls and backs off
+            when Instagram throttles.
+
+    Raises:
+        Throttled: If Instagram keeps throttling, the names read so far and the
+            checkpoint are saved.
     """
-    collection = repo.followers if my_followers else repo.followings
+    list_name = "followers" if my_followers else "followings"
+    resume_from = checkpoints.load(list_name) if checkpoints else None
+
+    extraction = ListExtraction(
+        page,
+        repo,
+        my_followers,
+        source,
+        speed_profile,
+        metrics,
+        resume_from,
+        delta,
+        scheduler,
+    )
+    extraction.open()
 
-    # Open popup of people user follows
-    btn_text = "followers" if my_followers else "following"
-    following_link = page.locator(f"header ul [role=link]:has-text('{btn_text}')")
+    # Extract followers or followings
+    try:
+        while extraction.step():
+            # Persist names in cache
+            extraction.save(repo)
+            extraction.save_checkpoint(checkpoints)
+            extraction.scroll()
+    finally:
+        extraction.close()
+        extraction.flush_checkpoint(checkpoints)
 
-    followers_count = "".join(re.findall(r"\d+", following_link.text_content()))
-    followers_count = int(followers_count) if followers_count else 0
+    if extraction.reconcile():
+        repo.save()
+    extraction.save_checkpoint(checkpoints, force=True)
 
-    extraction_page_size = 12
-    max_expected_cycles = math.ceil(followers_count / extraction_page_size)
-    print(
-        f"Detected {followers_count} {btn_text}. Will do max {max_expected_cycles} cycles"
-    )
 
-    following_link.click()
+def extract_followers_and_followings(
+    page: Page,
+    repo: FollowerCache,
+    source=constants.SCRAPE_SOURCE,
+    speed_profile=constants.SPEED_PROFILE,
+    metrics: Optional[ScrapeMetrics] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+    delta=constants.DELTA_SYNC,
+    scheduler: Optional[RequestScheduler] = None,
+):
+    """
+    Extracts followers and followings at the same time. The followings dialog is
+    opened in a second page of the same browser context and both dialogs are
+    scrolled in turns, so one list loads while the other one is being read.
+    Everything runs on the calling thread, the cache is saved once per round.
 
-    prev_last_user = None
-    # Extract followers or followings
-    for _ in range(max_expected_cycles):
-        time.sleep(2)
+    Args:
+        page (Page): The Playwright page object, already on the profile page.
+        repo (FollowerCache): The cache object to store followers and followings.
+        source (str): "dom" reads names from the dialogs, "network" parses them
+            from the API responses the dialogs load.
+        speed_profile (str): The name of the speed profile used to pace the scrolling.
+        metrics (Optional[ScrapeMetrics]): Records the timing of every cycle.
+        checkpoints (Optional[CheckpointStore]): Where to save and resume the positions.
+        delta (bool): Stop once the newest names are already cached, see
+            ListExtraction.reach_known_names.
+        scheduler (Optional[RequestScheduler]): Paces the scrolls of both lists
+            and backs off when Instagram throttles.
 
-        # In cache we have exactly same number of followers
-        # as user has at this moment, no need to fetch follower names again
-        if followers_count == len(collection):
-            break
+    Raises:
+        Throttled: If Instagram keeps throttling, the names read so far and the
+            checkpoints are saved.
+    """
+    metrics = metrics or ScrapeMetrics()
+    scheduler = scheduler or RequestScheduler()
+    with metrics.phase("navigation"):
+        followings_page = page.context.new_page()
+        followings_page.goto(page.url)
+        followings_page.locator("header ul [role=link]").first.wait_for()
 
-        following_links_locator = page.locator("css=div[role=dialog] a[role=link] span")
-        following_links = following_links_locator.all()
+    def resume_from(list_name: str) -> Optional[Checkpoint]:
+        return checkpoints.load(list_name) if checkpoints else None
 
-        # If after fetching new set of followers and the
-        # modal's content doesn't change, then no more followers left to analyze
-        new_last_user = following_links[-1].text_content()
-        if new_last_user == prev_last_user:
-            break
+    extractions = [
+        ListExtraction(
+            page,
+            repo,
+            True,
+            source,
+            speed_profile,
+            metrics,
+            resume_from("followers"),
+            delta,
+            scheduler,
+        ),
+        ListExtraction(
+            followings_page,
+            repo,
+            False,
+            source,
+            speed_profile,
+            metrics,
+            resume_from("followings"),
+            delta,
+            scheduler,
+        ),
+    ]
 
-        prev_last_user = new_last_user
+    try:
+        for extraction in extractions:
+            extraction.open()
 
-        for link in following_links:
-            name = link.text_content()
-            collection.add(name)
+        active = extractions
+        while active:
+            stepped = [extraction for extraction in active if extraction.step()]
 
-        # Persist names in cache
-        repo.save()
+            # A list that is done drops its checkpoint right away, the other
+            # one may still be cut short by throttling
+            for extraction in active:
+                if extraction not in stepped:
+                    extraction.save_checkpoint(checkpoints, force=True)
+            active = stepped
 
-        # Scroll followers list to its bottom
-        page.evaluate("""() => {
-            const list = document.querySelector('[role=dialog] [style*="overflow: hidden auto;"]').parentElement;
-            list.scrollTo({top: list.scrollHeight, behavior: "smooth"});
-        }""")
+            # Persist names of both lists in cache, the save counts for both cycles
+            start = time.perf_counter()
+            repo.save()
+            save_seconds = time.perf_counter() - start
+            for extraction in active:
+                extraction.record_cycle(save_seconds)
+                extraction.save_checkpoint(checkpoints)
+
+            for extraction in active:
+                extraction.scroll()
+    finally:
+        for extraction in extractions:
+            extraction.close()
+            extraction.flush_checkpoint(checkpoints)
+        followings_page.close()
+
+    if sum(extraction.reconcile() for extraction in extractions):
+        repo.save()
+    for extraction in extractions:
+        extraction.save_checkpoint(checkpoints, force=True)
@@ -8,6 +8,7 @@ from rich.panel import Panel
 from rich.table import Table
 
 import constants
+from export import stats_categories
 
 console = Console()
 
@@ -29,16 +30,27 @@ def print_rate_limit_error():
     )
 
 
-def print_followers_stats(insights, include_haters=True, include_ghosts=True):
+def print_followers_stats(
+    insights,
+    include_haters=True,
+    include_ghosts=True,
+    records=None,
+    first_index=1,
+    caption=None,
+):
     """
     Prints a table of follower statistics to the console.
 
     Args:
-        insights (dict): A dictionary containing follower insights.
+        insights (analyzer.InsightRecords): The insights on all users.
         include_haters (bool): Whether to include haters in the table.
         include_ghosts (bool): Whether to include ghosts in the table.
+        records (Iterable[analyzer.InsightRecord]): The rows to print, e.g. a
+            single page. Defaults to all users of the included categories.
+        first_index (int): The number of the first row.
+        caption (str): Text shown under the table.
     """
-    table = Table(title="Instagram Followers")
+    table = Table(title="Instagram Followers", caption=caption)
     table.add_column("#", justify="center", style="cyan", no_wrap=True)
     table.add_column("Username", justify="left", style="cyan", no_wrap=True)
 
@@ -50,36 +62,23 @@ def print_followers_stats(insights, include_haters=True, include_ghosts=True):
 
     table.add_column("Account URL", justify="left", style="cyan")
 
-    idx = 1
-    for key, record in insights.items():
-        is_ghost, is_hater, is_friend = (
-            record["is_ghost"],
-            record["is_hater"],
-            not record["is_hater"] and not record["is_ghost"],
-        )
+    if records is None:
+        records = insights.filter(*stats_categories(include_haters, include_ghosts))
 
+    for idx, record in enumerate(records, start=first_index):
         label_follows_back = (
-            "[green]Yes[/green]" if not is_hater else "[red]No 😾[/red]"
+            "[green]Yes[/green]" if not record.is_hater else "[red]No 😾[/red]"
         )
         label_I_follow_them = (
-            "[green]Yes[/green]" if not is_ghost else "[red]No 👻[/red]"
+            "[green]Yes[/green]" if not record.is_ghost else "[red]No 👻[/red]"
         )
 
-        if is_friend and (include_ghosts ^ include_haters):
-            continue
-
-        if not include_ghosts and is_ghost:
-            continue
-
-        if not include_haters and is_hater:
-            continue
-
         row_data = [
             str(idx),
-            key,
+            record.username,
             label_follows_back,
             label_I_follow_them,
-            f"{constants.IG_BASE_URL}/{key}/",
+            f"{constants.IG_BASE_URL}/{record.username}/",
         ]
 
         if not include_haters:
@@ -89,6 +88,80 @@ def print_followers_stats(insights, include_haters=True, include_ghosts=True):
             del row_data[3]
 
         table.add_row(*row_data)
-        idx += 1
+
+    console.print(table)
+
+
+def print_batch_report(reports, elapsed):
+    """
+    Prints a table with the throughput of every account of a batch run.
+
+    Args:
+        reports (list[batch.AccountReport]): The outcome of every account.
+        elapsed (float): The wall-clock seconds the whole batch took.
+    """
+    table = Table(title="Batch Run")
+    table.add_column("Account", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Status", justify="left")
+    table.add_column("Names", justify="right", style="magenta")
+    table.add_column("Change", justify="right", style="magenta")
+    table.add_column("Read", justify="right")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Names/s", justify="right")
+
+    for report in reports:
+        status = (
+            "[green]Collected[/green]"
+            if report.collected
+            else f"[red]Failed: {report.error}[/red]"
+        )
+        table.add_row(
+            report.username,
+            status,
+            str(report.names),
+            f"{report.new_names:+d}",
+            str(report.names_read),
+            f"{report.elapsed:.1f}",
+            f"{report.throughput:.1f}",
+        )
+
+    total_new = sum(report.new_names for report in reports)
+    total_read = sum(report.names_read for report in reports)
+    table.add_section()
+    table.add_row(
+        "Total",
+        f"{sum(report.collected for report in reports)}/{len(reports)} collected",
+        str(sum(report.names for report in reports)),
+        f"{total_new:+d}",
+        str(total_read),
+        f"{elapsed:.1f}",
+        f"{total_read / elapsed if elapsed else 0.0:.1f}",
+    )
+
+    console.print(table)
+
+
+def print_snapshot_diff(diff):
+    """
+    Prints the changes between two snapshots to the console.
+
+    Args:
+        diff (diff.SnapshotDiff): The changes between the snapshots.
+    """
+    table = Table(
+        title=f"Changes between snapshots #{diff.old_snapshot} and #{diff.new_snapshot}"
+    )
+    table.add_column("Change", justify="left", style="cyan", no_wrap=True)
+    table.add_column("Count", justify="right", style="magenta")
+    table.add_column("Usernames", justify="left")
+
+    rows = [
+        ("New followers", "green", diff.new_followers),
+        ("Lost followers", "red", diff.lost_followers),
+        ("New followings", "green", diff.new_followings),
+        ("Dropped followings", "red", diff.dropped_followings),
+    ]
+    for label, style, names in rows:
+        table.add_row(label, str(len(names)), f"[{style}]{', '.join(names)}[/{style}]")
 
     console.print(table)
@@ -2,11 +2,79 @@
 This module defines constants used throughout the Follower Lens application.
 """
 
-# The base URL for Instagram.
-IG_BASE_URL = "https://www.instagram.com"
+import os
+
+# The base URL for Instagram. FOLLOWER_LENS_BASE_URL points the app at another
+# host instead, e.g. the local mock site of benchmarks/mock_site.py.
+IG_BASE_URL = os.environ.get(
+    "FOLLOWER_LENS_BASE_URL", "https://www.instagram.com"
+).rstrip("/")
 
 # Encryption Key Path
 ENCRYPTION_KEY_PATH = "secret.key"
 
 # User Log in credentials Path
 CREDENTIALS_PATH = "cache/credentials.json"
+
+# Where follower names are read from: "dom" scrapes the followers dialog,
+# "network" parses the API responses the dialog loads while it is scrolled.
+SCRAPE_SOURCE = "dom"
+
+# How fast the followers dialog is scrolled, one of commands.pacing.SPEED_PROFILES.
+SPEED_PROFILE = "normal"
+
+# How the follower cache is stored: "json" rewrites the whole file on every save,
+# "journal" appends new names to a journal and compacts it into the JSON file,
+# "sqlite" keeps every sync as a timestamped snapshot in a SQLite database,
+# "binary" opens a sorted binary snapshot with mmap instead of loading it.
+CACHE_BACKEND = "journal"
+
+# Scrape followers and followings side by side in two pages of the same browser.
+CONCURRENT_LISTS = False
+
+# Which scrape engine the START command runs: "sync" or "async" (see async_engine.py).
+ENGINE = "sync"
+
+# Run the browser headless and block images, media, fonts and tracking requests.
+LEAN_BROWSER = False
+
+# Number of users shown per page when browsing follower statistics.
+STATS_PAGE_SIZE = 50
+
+# Where the timing report of every sync is written, see metrics.py.
+METRICS_DIR = "metrics"
+
+# A Prometheus textfile updated after every sync, e.g.
+# "/var/lib/node_exporter/textfile_collector/follower_lens.prom". None disables it.
+PROMETHEUS_TEXTFILE = None
+
+# Save the position of every list as it is read and continue an
+# interrupted extraction from there on the next sync, see checkpoint.py.
+RESUME_EXTRACTION = True
+
+# The position is written every CHECKPOINT_EVERY cycles, and when the extraction
+# stops early. A crash in between resumes a few pages earlier.
+CHECKPOINT_EVERY = 10
+
+# Stop a sync once the newest users of a list are already cached, instead of
+# scrolling the whole list. The dialog lists the newest users first.
+DELTA_SYNC = True
+
+# How many already cached names in a row end a delta sync.
+DELTA_SYNC_STOP_AFTER = 36
+
+# How many users the profile header may count beyond the ones the dialog shows,
+# e.g. deactivated accounts. A list read up to that many users short is still
+# complete, and a delta sync still stops early.
+DELTA_SYNC_HIDDEN_USERS = 3
+
+# How many scroll and navigation actions the scraper may take per second on
+# average, and in a burst, see scheduler.py. None disables the pacing.
+ACTIONS_PER_SECOND = 2.0
+ACTIONS_BURST = 5
+
+# Seconds to back off when Instagram throttles mid-scrape, doubled on every
+# retry up to THROTTLE_MAX_BACKOFF. The scrape gives up after THROTTLE_RETRIES.
+THROTTLE_BACKOFF = 30.0
+THROTTLE_MAX_BACKOFF = 600.0
+THROTTLE_RETRIES = 3
@@ -0,0 +1,157 @@
+"""
+This module compares two stored snapshots of the same account: who followed,
+who unfollowed, who was followed and who was dropped between two syncs.
+The lists are compared by a streaming merge over sorted usernames, so memory
+only grows with the number of changes, not with the size of the account.
+"""
+
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+
+def merge_diff(old: Iterable[str], new: Iterable[str]) -> Iterator[tuple[str, int]]:
+    """
+    Compares two sorted sequences of usernames.
+
+    Args:
+        old (Iterable[str]): The sorted usernames of the older snapshot.
+        new (Iterable[str]): The sorted usernames of the newer snapshot.
+
+    Returns:
+        Iterator[tuple[str, int]]: (username, 1) for every user only in `new`
+            and (username, -1) for every user only in `old`, in username order.
+    """
+    old, new = iter(old), iter(new)
+    old_name, new_name = next(old, None), next(new, None)
+
+    while old_name is not None and new_name is not None:
+        if old_name == new_name:
+            old_name, new_name = next(old, None), next(new, None)
+        elif old_name < new_name:
+            yield old_name, -1
+            old_name = next(old, None)
+        else:
+            yield new_name, 1
+            new_name = next(new, None)
+
+    while old_name is not None:
+        yield old_name, -1
+        old_name = next(old, None)
+
+    while new_name is not None:
+        yield new_name, 1
+        new_name = next(new, None)
+
+
+class ListDiff(NamedTuple):
+    """
+    The changes of one list between two snapshots.
+
+    Attributes:
+        added (list[str]): Users that joined the list.
+        removed (list[str]): Users that left the list.
+    """
+
+    added: list[str]
+    removed: list[str]
+
+    @classmethod
+    def compare(cls, old: Iterable[str], new: Iterable[str]) -> "ListDiff":
+        """Build the diff of two sorted sequences of usernames."""
+        added, removed = [], []
+        for name, change in merge_diff(old, new):
+            (added if change > 0 else removed).append(name)
+        return cls(added, removed)
+
+
+class SnapshotDiff(NamedTuple):
+    """
+    The changes of an account between two snapshots.
+
+    Attributes:
+        old_snapshot (int): The id of the older snapshot.
+        new_snapshot (int): The id of the newer snapshot.
+        followers (ListDiff): The changes of the followers list.
+        followings (ListDiff): The changes of the followings list.
+    """
+
+    old_snapshot: int
+    new_snapshot: int
+    followers: ListDiff
+    followings: ListDiff
+
+    @property
+    def new_followers(self) -> list[str]:
+        """Users that started following the account."""
+        return self.followers.added
+
+    @property
+    def lost_followers(self) -> list[str]:
+        """Users that stopped following the account."""
+        return self.followers.removed
+
+    @property
+    def new_followings(self) -> list[str]:
+        """Users the account started following."""
+        return self.followings.added
+
+    @property
+    def dropped_followings(self) -> list[str]:
+        """Users the account stopped following."""
+        return self.followings.removed
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of users in every category."""
+        return {
+            "new_followers": len(self.new_followers),
+            "lost_followers": len(self.lost_followers),
+            "new_followings": len(self.new_followings),
+            "dropped_followings": len(self.dropped_followings),
+        }
+
+
+def diff_snapshots(repo, old_snapshot: int, new_snapshot: int) -> SnapshotDiff:
+    """
+    Compares two snapshots of a cache that keeps history.
+
+    Args:
+        repo (SQLiteFollowerCache): The cache of the account.
+        old_snapshot (int): The id of the older snapshot.
+        new_snapshot (int): The id of the newer snapshot.
+
+    Returns:
+        SnapshotDiff: The changes between the snapshots.
+    """
+    return SnapshotDiff(
+        old_snapshot=old_snapshot,
+        new_snapshot=new_snapshot,
+        followers=ListDiff.compare(
+            repo.iter_snapshot(old_snapshot, "followers"),
+            repo.iter_snapshot(new_snapshot, "followers"),
+        ),
+        followings=ListDiff.compare(
+            repo.iter_snapshot(old_snapshot, "followings"),
+            repo.iter_snapshot(new_snapshot, "followings"),
+        ),
+    )
+
+
+def diff_latest(repo) -> Optional[SnapshotDiff]:
+    """
+    Compares the two latest snapshots of a cache.
+
+    Args:
+        repo (FollowerCache | SQLiteFollowerCache): The cache of the account.
+
+    Returns:
+        Optional[SnapshotDiff]: The changes, or None if the cache keeps no history
+            or has fewer than two snapshots.
+    """
+    if not hasattr(repo, "list_snapshots"):
+        return None
+
+    snapshots = repo.list_snapshots()
+    if len(snapshots) < 2:
+        return None
+
+    (old_snapshot, _), (new_snapshot, _) = snapshots[-2:]
+    return diff_snapshots(repo, old_snapshot, new_snapshot)
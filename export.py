@@ -0,0 +1,261 @@
+"""
+This module exports follower insights to CSV or JSON Lines files, optionally gzipped,
+and writes them as plain tab-separated text when the output is not a terminal.
+Rows are written one at a time as they are produced, so memory does not grow with
+the size of the account. It only depends on the standard library, so scripts can
+use it without loading the terminal UI.
+"""
+
+import csv
+import gzip
+import json
+import sys
+from pathlib import Path
+from typing import Iterator, Optional
+
+import constants
+
+FORMATS = ("csv", "jsonl")
+
+CATEGORIES = ("all", "haters", "ghosts", "mutuals")
+
+FIELDS = ["username", "category", "follows_me_back", "i_follow_them", "url"]
+
+
+def _row(username: str, is_follower: bool, is_following: bool) -> dict:
+    """Build the exported row of a user."""
+    if is_follower and is_following:
+        category = "mutuals"
+    elif is_following:
+        category = "haters"
+    else:
+        category = "ghosts"
+
+    return {
+        "username": username,
+        "category": category,
+        "follows_me_back": is_follower,
+        "i_follow_them": is_following,
+        "url": f"{constants.IG_BASE_URL}/{username}/",
+    }
+
+
+def iter_insight_rows(insights, category: str = "all") -> Iterator[dict]:
+    """
+    Iterates over the rows of the users of a category.
+
+    Args:
+        insights (analyzer.InsightRecords): The insights on all users.
+        category (str): One of "all", "haters", "ghosts" or "mutuals".
+
+    Returns:
+        Iterator[dict]: The rows.
+    """
+    for record in insights.filter(category):
+        yield _row(record.username, not record.is_hater, not record.is_ghost)
+
+
+def iter_cache_rows(repo, category: str = "all") -> Iterator[dict]:
+    """
+    Iterates over the rows of the users of a category straight from a cache,
+    without building the insights first.
+
+    Args:
+        repo (FollowerCache | SQLiteFollowerCache): The cache of the account.
+        category (str): One of "all", "haters", "ghosts" or "mutuals".
+
+    Returns:
+        Iterator[dict]: The rows.
+    """
+    followers, followings = repo.followers, repo.followings
+
+    if category in ("all", "ghosts", "mutuals"):
+        for name in followers:
+            is_following = followings.contains(name)
+            if category == "all" or is_following == (category == "mutuals"):
+                yield _row(name, True, is_following)
+
+    if category in ("all", "haters"):
+        for name in followings:
+            if not followers.contains(name):
+                yield _row(name, False, True)
+
+
+def stats_categories(include_haters=True, include_ghosts=True) -> list[str]:
+    """
+    Returns the insight categories shown in the follower statistics.
+
+    Args:
+        include_haters (bool): Whether to include haters.
+        include_ghosts (bool): Whether to include ghosts.
+
+    Returns:
+        list[str]: The categories, see analyzer.InsightRecords.CATEGORIES.
+    """
+    categories = []
+    if include_haters:
+        categories.append("haters")
+    if include_ghosts:
+        categories.append("ghosts")
+
+    # Friends are listed unless exactly one of haters or ghosts is asked for
+    if not include_ghosts ^ include_haters:
+        categories.append("mutuals")
+
+    return categories
+
+
+def stream_followers_stats(
+    insights, include_haters=True, include_ghosts=True, file=None
+):
+    """
+    Writes follower statistics as tab-separated lines, one line per user as soon
+    as it is produced. Meant for output that is not a terminal.
+
+    Args:
+        insights (analyzer.InsightRecords): The insights on all users.
+        include_haters (bool): Whether to include haters.
+        include_ghosts (bool): Whether to include ghosts.
+        file (TextIO): Where to write, defaults to stdout.
+    """
+    file = file or sys.stdout
+
+    header = ["#", "username"]
+    if include_haters:
+        header.append("follows_me_back")
+    if include_ghosts:
+        header.append("i_follow_them")
+    header.append("url")
+    file.write("\t".join(header) + "\n")
+
+    categories = stats_categories(include_haters, include_ghosts)
+    for idx, record in enumerate(insights.filter(*categories), start=1):
+        row = [str(idx), record.username]
+        if include_haters:
+            row.append("no" if record.is_hater else "yes")
+        if include_ghosts:
+            row.append("no" if record.is_ghost else "yes")
+        row.append(f"{constants.IG_BASE_URL}/{record.username}/")
+        file.write("\t".join(row) + "\n")
+
+
+def stream_snapshot_diff(diff, file=None):
+    """
+    Writes the changes between two snapshots as tab-separated lines, one line
+    per changed user. Meant for output that is not a terminal.
+
+    Args:
+        diff (diff.SnapshotDiff): The changes between the snapshots.
+        file (TextIO): Where to write, defaults to stdout.
+    """
+    file = file or sys.stdout
+
+    file.write("change\tusername\n")
+    for change, names in (
+        ("new_follower", diff.new_followers),
+        ("lost_follower", diff.lost_followers),
+        ("new_following", diff.new_followings),
+        ("dropped_following", diff.dropped_followings),
+    ):
+        for name in names:
+            file.write(f"{change}\t{name}\n")
+
+
+def detect_format(path: str) -> tuple[Optional[str], bool]:
+    """
+    Tells the format and the compression from the file name.
+
+    Args:
+        path (str): The path, e.g. "haters.csv" or "all.jsonl.gz".
+
+    Returns:
+        tuple[Optional[str], bool]: The format, if the extension is a supported
+            one, and whether the file is gzipped.
+    """
+    suffixes = Path(path).suffixes
+    compress = bool(suffixes) and suffixes[-1] == ".gz"
+    if compress:
+        suffixes = suffixes[:-1]
+
+    fmt = suffixes[-1].lstrip(".") if suffixes else None
+    return (fmt if fmt in FORMATS else None), compress
+
+
+def export_rows(
+    rows: Iterator[dict],
+    path: str,
+    fmt: Optional[str] = None,
+    compress: Optional[bool] = None,
+) -> int:
+    """
+    Writes rows to a file as they are produced.
+
+    Args:
+        rows (Iterator[dict]): The rows, see FIELDS.
+        path (str): The file to write.
+        fmt (Optional[str]): "csv" or "jsonl", detected from the path by default.
+        compress (Optional[bool]): Whether to gzip, detected from the path by default.
+
+    Raises:
+        ValueError: If no format is given and the path has no supported extension.
+
+    Returns:
+        int: The number of rows written.
+    """
+    detected_fmt, detected_compress = detect_format(path)
+    fmt = fmt or detected_fmt
+    compress = detected_compress if compress is None else compress
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Cannot export to '{path}', expected one of {FORMATS}")
+
+    file = Path(path)
+    file.parent.mkdir(parents=True, exist_ok=True)
+
+    opener = gzip.open if compress else open
+    count = 0
+    with opener(file, "wt", encoding="utf-8", newline="") as out:
+        if fmt == "csv":
+            writer = csv.DictWriter(out, fieldnames=FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                out.write(json.dumps(row) + "\n")
+                count += 1
+
+    return count
+
+
+def export_insights(insights, path: str, category: str = "all", **kwargs) -> int:
+    """
+    Exports the users of a category to a CSV or JSON Lines file.
+
+    Args:
+        insights (analyzer.InsightRecords): The insights on all users.
+        path (str): The file to write, the format is detected from its extension.
+        category (str): One of "all", "haters", "ghosts" or "mutuals".
+        **kwargs: `fmt` and `compress`, see export_rows.
+
+    Returns:
+        int: The number of rows written.
+    """
+    return export_rows(iter_insight_rows(insights, category), path, **kwargs)
+
+
+def export_cache(repo, path: str, category: str = "all", **kwargs) -> int:
+    """
+    Exports the users of a category straight from a cache to a CSV or JSON Lines file.
+
+    Args:
+        repo (FollowerCache | SQLiteFollowerCache): The cache of the account.
+        path (str): The file to write, the format is detected from its extension.
+        category (str): One of "all", "haters", "ghosts" or "mutuals".
+        **kwargs: `fmt` and `compress`, see export_rows.
+
+    Returns:
+        int: The number of rows written.
+    """
+    return export_rows(iter_cache_rows(repo, category), path, **kwargs)
@@ -1,104 +1,388 @@
 """
 This module provides the main entry point for the Instagram follower analysis tool.
-It includes functions to run the tool, clear the cache, and handle user commands.
+Without arguments it runs the interactive menu. With a subcommand it runs a single
+action without prompts, e.g. `python main.py haters --username me > haters.tsv`.
+Report-only commands load neither the browser nor the terminal UI, so they start
+in milliseconds and can run from cron jobs and scripts.
 """
 
+import argparse
 import sys
-import time
-from enum import Enum
-from pathlib import Path
-
-import inquirer
-from inquirer.themes import BlueComposure
-from playwright.sync_api import Playwright, sync_playwright
-
-import auth
-import cli
-import commands
-import console
+from typing import TYPE_CHECKING, Optional
+
 import constants
-from analyzer import FollowerInsights
-from cache import FollowerCache
+import diff
+import export
+from analyzer import FollowerInsights, InsightRecords
+from cache import FollowerCache, open_cache
+from checkpoint import CheckpointStore
 from model import Account
 
+if TYPE_CHECKING:
+    from browser import BrowserSession
+    from metrics import ScrapeMetrics
+    from scheduler import RequestScheduler
+
 
-def run_simplified(playwright: Playwright, account: Account, repo: FollowerCache):
+def run_simplified(
+    session: "BrowserSession",
+    account: Account,
+    repo: FollowerCache,
+    scheduler: Optional["RequestScheduler"] = None,
+) -> bool:
     """
     Run the simplified version of the follower analysis tool.
 
     Args:
-        playwright (Playwright): The Playwright instance.
+        session (BrowserSession): The browser session, started if it isn't running yet.
         account (Account): The account object containing user credentials.
         repo (FollowerCache): The cache object to store followers or followings.
-    """
-    browser = playwright.chromium.launch(headless=False, slow_mo=300)
-    context = browser.new_context()
-    page = context.new_page()
-
-    # 1. Restore cookies to not log in again
-    restored = auth.restore_cookies(context, account)
-    print(f"Session restored: {restored}")
-
-    page.goto(f"{constants.IG_BASE_URL}/")
+        scheduler (Optional[RequestScheduler]): Paces the navigations and scrolls,
+            and backs off when Instagram throttles.
 
-    # 2. Check if Instagram blocks the bot
-    if page.locator(":has-text('Something went wrong')").count():
+    Returns:
+        bool: True if all followers and followings were collected, False if
+            Instagram kept throttling the account. The names read so far are
+            saved then and the next sync resumes from them.
+    """
+    import console
+    import metrics
+    from scheduler import RequestScheduler, Throttled
+
+    scrape_metrics = metrics.ScrapeMetrics()
+    checkpoints = open_checkpoints(account) if constants.RESUME_EXTRACTION else None
+    scheduler = scheduler or RequestScheduler()
+
+    # 1. Launch the browser and restore the session to not log in again
+    with scrape_metrics.phase("launch"):
+        session.start()
+    repo.begin_snapshot()
+
+    try:
+        collect(session, account, repo, scrape_metrics, checkpoints, scheduler)
+    except Throttled:
+        # The timings show where Instagram slowed down, keep them
+        scrape_metrics.throttled = True
+        report = metrics.export_run(scrape_metrics, account.get_encoded_username())
         console.print_rate_limit_error()
-        sys.exit(0)
-
-    # 3. Fill the login form
-    if not restored:
-        auth.manual_login(page, account)
+        print("💾 Progress saved, the next sync continues where this one stopped.")
+        print(f"Timings saved to {report}")
+        return False
 
-    # 4. Go to Profile page
-    link_locator = page.locator("[role='link']")
-    profile_link = link_locator.filter(has_text="Profile")
-    profile_link.click()
+    # 8. Keep the browser running for the next sync
+    report = metrics.export_run(scrape_metrics, account.get_encoded_username())
+    print("✅ Successfully collected all information about your followers!")
+    print(
+        f"Took {scrape_metrics.elapsed:.1f}s in {len(scrape_metrics.cycles)} cycles, "
+        f"timings saved to {report}"
+    )
+    return True
 
-    page.wait_for_url(f"**/{account.username}/**")
-    time.sleep(2)
 
-    # 5. Get all followers
-    commands.profile.extract_followers(page=page, repo=repo, my_followers=True)
+def collect(
+    session: "BrowserSession",
+    account: Account,
+    repo: FollowerCache,
+    scrape_metrics: "ScrapeMetrics",
+    checkpoints: Optional[CheckpointStore],
+    scheduler: "RequestScheduler",
+):
+    """
+    Runs the steps of run_simplified that talk to Instagram, in a started session.
 
-    # 6. Close the dialog
-    page.locator('[role=dialog] svg:has-text("Close")').click()
+    Args:
+        session (BrowserSession): The started browser session.
+        account (Account): The account object containing user credentials.
+        repo (FollowerCache): The cache object to store followers or followings.
+        scrape_metrics (ScrapeMetrics): Where the phase and cycle timings are recorded.
+        checkpoints (Optional[CheckpointStore]): The checkpoints of the account.
+        scheduler (RequestScheduler): Paces the navigations and scrolls.
 
-    # 7. Get all followings
-    commands.profile.extract_followers(page=page, repo=repo, my_followers=False)
+    Raises:
+        Throttled: If Instagram keeps throttling the account after every retry.
+    """
+    import auth
+    import commands
+    from scheduler import THROTTLE_SCRIPT
+
+    page = session.page
+
+    # The session may already be checked by a previous sync
+    if not session.verified:
+        # 2. Check the restored session and if Instagram blocks the bot
+        attempt = 0
+        while True:
+            with scrape_metrics.phase("probe"):
+                status = auth.probe_session(session.context)
+            print(f"Session restored: {session.restored}, status: {status.value}")
+            if status != auth.SessionStatus.RATE_LIMITED:
+                break
+
+            with scrape_metrics.phase("throttle_backoff"):
+                scheduler.back_off(attempt)
+            attempt += 1
+
+        # 3. Fill the login form
+        if status == auth.SessionStatus.EXPIRED:
+            with scrape_metrics.phase("login"):
+                scheduler.pace()
+                page.goto(f"{constants.IG_BASE_URL}/")
+                auth.manual_login(page, account)
+        session.verified = True
+
+    # 4. Go to Profile page, again after a while if Instagram shows a throttling message
+    attempt = 0
+    while True:
+        with scrape_metrics.phase("navigation"):
+            scheduler.pace()
+            page.goto(f"{constants.IG_BASE_URL}/{account.username}/")
+            page.wait_for_url(f"**/{account.username}/**")
+            throttled = page.evaluate(THROTTLE_SCRIPT)
+            if not throttled:
+                page.locator("header ul [role=link]").first.wait_for()
+        if not throttled:
+            break
+
+        with scrape_metrics.phase("throttle_backoff"):
+            scheduler.back_off(attempt)
+        attempt += 1
+
+    if constants.CONCURRENT_LISTS:
+        # 5. Get all followers and followings side by side
+        commands.profile.extract_followers_and_followings(
+            page=page,
+            repo=repo,
+            metrics=scrape_metrics,
+            checkpoints=checkpoints,
+            scheduler=scheduler,
+        )
+    else:
+        # 5. Get all followers
+        commands.profile.extract_followers(
+            page=page,
+            repo=repo,
+            my_followers=True,
+            metrics=scrape_metrics,
+            checkpoints=checkpoints,
+            scheduler=scheduler,
+        )
 
-    # 8. Shut down the browser
-    browser.close()
-    print("✅ Successfully collected all information about your followers!")
+        # 6. Close the dialog, a resumed extraction may not have opened it
+        with scrape_metrics.phase("close_followers_dialog"):
+            close_button = page.locator('[role=dialog] svg:has-text("Close")')
+            if close_button.count():
+                close_button.click()
+
+        # 7. Get all followings
+        commands.profile.extract_followers(
+            page=page,
+            repo=repo,
+            my_followers=False,
+            metrics=scrape_metrics,
+            checkpoints=checkpoints,
+            scheduler=scheduler,
+        )
 
 
-def clear_cache(account: Account):
+def clear_cache(repo: FollowerCache, account: Account):
     """
     Clear the cache for the given account.
 
     Args:
-        account (Account): The account object containing user credentials.
+        repo (FollowerCache): The cache object of the account.
+        account (Account): The account, its unfinished extractions are forgotten too.
     """
-    Path(f"cache/{account.get_encoded_username()}.json").write_text("")
+    repo.clear()
+    open_checkpoints(account).clear()
     print(
         "Cache cleared, the previously stored information about your followers is removed.\n"
     )
 
 
-def main():
+def sync(session: "BrowserSession", account: Account, repo: FollowerCache) -> bool:
     """
-    The main entry point for the Instagram follower analysis tool.
-    Handles user commands and runs the appropriate functions.
+    Collect the followers and followings of the account with the configured engine.
+
+    Args:
+        session (BrowserSession): The browser session used by the sync engine.
+        account (Account): The account object containing user credentials.
+        repo (FollowerCache): The cache object to store followers or followings.
+
+    Returns:
+        bool: False if Instagram kept throttling the account, see run_simplified.
+    """
+    if constants.ENGINE == "async":
+        import asyncio
+
+        import async_engine
+
+        return asyncio.run(async_engine.run(account, repo))
+    return run_simplified(session, account, repo)
+
+
+def open_account_cache(account: Account) -> FollowerCache:
+    """
+    Open the cache of an account with the configured backend.
+
+    Args:
+        account (Account): The account, only its username is needed.
+
+    Returns:
+        FollowerCache: The cache of the account.
+    """
+    return open_cache(
+        f"cache/{account.get_encoded_username()}", backend=constants.CACHE_BACKEND
+    )
+
+
+def open_checkpoints(account: Account) -> CheckpointStore:
+    """
+    Open the extraction checkpoints of an account, stored next to its cache.
+
+    Args:
+        account (Account): The account, only its username is needed.
+
+    Returns:
+        CheckpointStore: The checkpoints of the account.
+    """
+    return CheckpointStore(f"cache/{account.get_encoded_username()}")
+
+
+def load_insights(repo: FollowerCache) -> FollowerInsights:
+    """
+    Build the insights on the users stored in a cache.
+
+    Args:
+        repo (FollowerCache): The cache of the account.
+
+    Returns:
+        FollowerInsights: The insights.
+    """
+    follower_insights = FollowerInsights()
+    follower_insights.load(repo.followers.to_list(), repo.followings.to_list())
+    return follower_insights
+
+
+def full_insights(repo: FollowerCache) -> InsightRecords:
+    """
+    Build the records of every user stored in a cache.
+
+    Args:
+        repo (FollowerCache): The cache of the account.
+
+    Returns:
+        InsightRecords: A record for every follower and following.
+    """
+    if getattr(repo, "sorted_lists", False):
+        # Lists read from a binary snapshot are sorted, a merge classifies every user
+        return InsightRecords.from_sorted(repo.followers, repo.followings)
+    return load_insights(repo).get_full_insights()
+
+
+class LazyInsights:
+    """
+    The insights of the menu, built by the first command that needs them, so
+    startup doesn't depend on the size of the account. Binary snapshots are
+    merged in username order, other caches keep a FollowerInsights that is
+    reloaded after every sync, reclassifying only the users that changed.
+    """
+
+    def __init__(self, repo: FollowerCache):
+        self.repo = repo
+        self.follower_insights: Optional[FollowerInsights] = None
+        self.records: Optional[InsightRecords] = None
+
+    def get_full_insights(self) -> InsightRecords:
+        """Return the records of every user, building them on the first call."""
+        if getattr(self.repo, "sorted_lists", False):
+            if self.records is None:
+                self.records = full_insights(self.repo)
+            return self.records
+
+        if self.follower_insights is None:
+            self.follower_insights = load_insights(self.repo)
+        return self.follower_insights.get_full_insights()
+
+    def reload(self):
+        """Pick up the changes of a sync, only if the insights were built already."""
+        self.records = None
+        if self.follower_insights is not None:
+            self.follower_insights.load(
+                self.repo.followers.to_list(), self.repo.followings.to_list()
+            )
+
+    def flush(self):
+        """Forget the insights after the cache was cleared."""
+        self.records = None
+        if self.follower_insights is not None:
+            self.follower_insights.flush()
+
+
+def print_report(repo: FollowerCache, include_haters=True, include_ghosts=True):
+    """
+    Print the follower statistics of a cache. A terminal gets one page of the
+    table at a time, anything else gets tab-separated lines.
+
+    Args:
+        repo (FollowerCache): The cache of the account.
+        include_haters (bool): Whether to include haters.
+        include_ghosts (bool): Whether to include ghosts.
+    """
+    insights = full_insights(repo)
+
+    if sys.stdout.isatty():
+        import cli
+
+        # Only the visible page is rendered, the first rows show up at once
+        cli.browse_followers_stats(insights, include_haters, include_ghosts)
+    else:
+        export.stream_followers_stats(insights, include_haters, include_ghosts)
+
+
+def print_diff(repo: FollowerCache):
+    """
+    Print the changes between the two latest syncs stored in a cache.
+
+    Args:
+        repo (FollowerCache): The cache of the account.
     """
+    snapshot_diff = diff.diff_latest(repo)
+    if snapshot_diff is None:
+        print(
+            "Need at least two syncs stored with the 'sqlite' cache backend to compare.\n",
+            file=sys.stderr,
+        )
+    elif sys.stdout.isatty():
+        import console
+
+        console.print_snapshot_diff(snapshot_diff)
+    else:
+        export.stream_snapshot_diff(snapshot_diff)
+
+
+def run_menu():
+    """
+    Runs the interactive menu. Handles user commands and runs the appropriate functions.
+    """
+    from enum import Enum
+
+    import inquirer
+    from inquirer.themes import BlueComposure
+
+    import cli
+    from browser import BrowserSession
+
     cli.print_introduction()
 
     # Setup account and read credentials from cache
     account = Account()
     cli.get_credentials(account)
 
-    repo = FollowerCache(f"cache/{account.get_encoded_username()}", preload=True)
-    follower_insights = FollowerInsights()
-    follower_insights.load(repo.followers.to_list(), repo.followings.to_list())
+    repo = open_account_cache(account)
+    follower_insights = LazyInsights(repo)
+
+    # Launched by the first sync and kept warm for the following ones
+    browser_session = BrowserSession(account)
 
     Command = Enum(
         "Command",
@@ -107,8 +391,10 @@ def main():
             ("LIST_HATERS", 2),
             ("LIST_GHOSTS", 3),
             ("LIST_ALL", 4),
-            ("CLEAR_CACHE", 5),
-            ("EXIST", 6),
+            ("DIFF", 5),
+            ("EXPORT", 6),
+            ("CLEAR_CACHE", 7),
+            ("EXIST", 8),
         ],
     )
 
@@ -133,6 +419,14 @@ def main():
                     "View Full Follower List – (Preview full list of followers/non-followers)",
                     Command.LIST_ALL,
                 ),
+                (
+                    "Compare Syncs – (Who followed and unfollowed me since the previous sync)",
+                    Command.DIFF,
+                ),
+                (
+                    "Export – (Save the lists to a CSV or JSON Lines file)",
+                    Command.EXPORT,
+                ),
                 (
                     "Clear the cache – (Delete locally stored data from previous executions)",
                     Command.CLEAR_CACHE,
@@ -149,40 +443,207 @@ def main():
 
         match action:
             case Command.START:
-                with sync_playwright() as playwright:
-                    run_simplified(playwright, account, repo)
-
-                    follower_insights.load(
-                        repo.followers.to_list(), repo.followings.to_list()
-                    )
+                sync(browser_session, account, repo)
+                follower_insights.reload()
 
             case Command.LIST_ALL:
-                console.print_followers_stats(
+                cli.browse_followers_stats(
                     insights=follower_insights.get_full_insights()
                 )
 
             case Command.LIST_HATERS:
-                console.print_followers_stats(
+                cli.browse_followers_stats(
                     insights=follower_insights.get_full_insights(),
                     include_ghosts=False,
                 )
 
             case Command.LIST_GHOSTS:
-                console.print_followers_stats(
+                cli.browse_followers_stats(
                     insights=follower_insights.get_full_insights(),
                     include_haters=False,
                 )
 
+            case Command.DIFF:
+                print_diff(repo)
+
+            case Command.EXPORT:
+                category, path = cli.ask_for_export()
+                count = export.export_insights(
+                    follower_insights.get_full_insights(), path, category
+                )
+                print(f"Exported {count} users to {path}\n")
+
             case Command.CLEAR_CACHE:
-                clear_cache(account)
+                clear_cache(repo, account)
                 follower_insights.flush()
 
             case Command.EXIST:
                 print("Shutting down, see you next time 👋 ...")
+                browser_session.close()
                 running = False
             case _:
                 print(f"Command {action} is not available yet!")
 
 
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the parser of the command line arguments.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        description="Find out who doesn't follow you back on Instagram. "
+        "Runs the interactive menu when no command is given."
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+
+    # Report commands read the cache only, the username is enough to find it
+    account_parser = argparse.ArgumentParser(add_help=False)
+    account_parser.add_argument(
+        "-u",
+        "--username",
+        help="the Instagram username, defaults to the one of the stored credentials",
+    )
+
+    subparsers.add_parser(
+        "sync", help="collect followers and followings with the stored credentials"
+    )
+    subparsers.add_parser(
+        "haters", parents=[account_parser], help="list people who don't follow me back"
+    )
+    subparsers.add_parser(
+        "ghosts",
+        parents=[account_parser],
+        help="list people who follow me but I don't follow them",
+    )
+    subparsers.add_parser(
+        "all", parents=[account_parser], help="list all followers and followings"
+    )
+    subparsers.add_parser(
+        "diff", parents=[account_parser], help="compare the two latest syncs"
+    )
+
+    export_parser = subparsers.add_parser(
+        "export",
+        parents=[account_parser],
+        help="save users to a CSV or JSON Lines file",
+    )
+    export_parser.add_argument(
+        "path", help="the file to write, e.g. haters.csv or all.jsonl.gz"
+    )
+    export_parser.add_argument(
+        "-c", "--category", choices=export.CATEGORIES, default="all"
+    )
+    export_parser.add_argument(
+        "-f",
+        "--format",
+        choices=export.FORMATS,
+        help="the file format, detected from the path by default",
+    )
+
+    subparsers.add_parser(
+        "clear", parents=[account_parser], help="delete the cached followers"
+    )
+
+    return parser
+
+
+def resolve_account(username: Optional[str] = None) -> Account:
+    """
+    Get the account a command runs for, without prompting.
+
+    Args:
+        username (Optional[str]): The username given on the command line.
+            Defaults to the one of the stored credentials.
+
+    Returns:
+        Account: The account.
+    """
+    account = Account()
+    if username:
+        account.username = username
+        return account
+
+    if not account.load_credentials(verbose=False):
+        print(
+            "No stored credentials, run `python main.py` once to log in "
+            "or pass --username.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    return account
+
+
+def run_command(args: argparse.Namespace):
+    """
+    Run a single command without prompts.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+    """
+    account = resolve_account(getattr(args, "username", None))
+    repo = open_account_cache(account)
+
+    match args.command:
+        case "sync":
+            from browser import BrowserSession
+
+            browser_session = BrowserSession(account)
+            try:
+                synced = sync(browser_session, account, repo)
+            finally:
+                browser_session.close()
+
+            if not synced:
+                sys.exit(1)
+
+        case "haters":
+            print_report(repo, include_ghosts=False)
+
+        case "ghosts":
+            print_report(repo, include_haters=False)
+
+        case "all":
+            print_report(repo)
+
+        case "diff":
+            print_diff(repo)
+
+        case "export":
+            count = export.export_cache(repo, args.path, args.category, fmt=args.format)
+            print(f"Exported {count} users to {args.path}", file=sys.stderr)
+
+        case "clear":
+            clear_cache(repo, account)
+
+
+def main(argv: Optional[list[str]] = None):
+    """
+    The main entry point for the Instagram follower analysis tool.
+
+    Args:
+        argv (Optional[list[str]]): The command line arguments, defaults to sys.argv.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if (
+        args.command == "export"
+        and args.format is None
+        and export.detect_format(args.path)[0] is None
+    ):
+        parser.error(
+            f"can't tell the format of {args.path}, use one of the extensions "
+            f"{', '.join(export.FORMATS)} (optionally .gz) or --format"
+        )
+
+    if args.command is None:
+        run_menu()
+    else:
+        run_command(args)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,364 @@
+"""
+This module measures where the time of a scrape goes: the phases of a run
+(navigation, login, opening a dialog, ...) and every scroll cycle of the
+followers/following dialogs (waiting for the scroll to settle, reading the new
+names, saving the cache). A run is exported as a JSON report and, optionally,
+as a Prometheus textfile for the node_exporter textfile collector.
+"""
+
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+import constants
+from utils.file_utils import atomic_write_text
+
+# Cycles averaged at the start and at the end of a list to tell if Instagram
+# answers slower as the scrape goes on.
+SLOWDOWN_WINDOW = 10
+
+
+class StepTiming(NamedTuple):
+    """
+    The timings of a single scroll cycle, as measured by a list extraction.
+
+    Attributes:
+        settle_seconds (float): Time waited for the previous scroll to settle.
+        harvest_seconds (float): Time spent reading the new names.
+        new_names (int): The number of names not seen before.
+        names_read (int): The number of names read, cached ones included.
+    """
+
+    settle_seconds: float
+    harvest_seconds: float
+    new_names: int
+    names_read: int
+
+
+class CycleMetrics(NamedTuple):
+    """
+    The timings of a scroll cycle, including the cache save that follows it.
+
+    Attributes:
+        list_name (str): Either "followers" or "followings".
+        number (int): The number of the cycle within its list, starting at 1.
+        settle_seconds (float): Time waited for the previous scroll to settle.
+        harvest_seconds (float): Time spent reading the new names.
+        save_seconds (float): Time spent saving the cache.
+        new_names (int): The number of names not seen before.
+        names_read (int): The number of names read, cached ones included.
+        total_names (int): The size of the list in the cache after the cycle.
+    """
+
+    list_name: str
+    number: int
+    settle_seconds: float
+    harvest_seconds: float
+    save_seconds: float
+    new_names: int
+    names_read: int
+    total_names: int
+
+    @property
+    def seconds(self) -> float:
+        """The measured time of the cycle."""
+        return self.settle_seconds + self.harvest_seconds + self.save_seconds
+
+
+def _summary(values: list[float]) -> dict:
+    """Return the mean, median, 95th percentile and maximum of the values."""
+    if not values:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+
+    ordered = sorted(values)
+    return {
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+class ScrapeMetrics:
+    """
+    Collects the timings of a scrape.
+
+    Attributes:
+        started_at (str): When the run started, as an ISO timestamp.
+        phases (dict[str, float]): The seconds spent in every phase of the run.
+        cycles (list[CycleMetrics]): Every scroll cycle of every list, in order.
+        throttled (bool): True if the run gave up because Instagram kept throttling.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self.phases: dict[str, float] = {}
+        self.cycles: list[CycleMetrics] = []
+        self.throttled = False
+        self._cycle_counts: dict[str, int] = {}
+        self._start = time.perf_counter()
+        self._elapsed: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Measures a phase of the run, the time of repeated phases adds up.
+
+        Args:
+            name (str): The name of the phase, e.g. "navigation".
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (
+                time.perf_counter() - start
+            )
+
+    def record_cycle(
+        self,
+        list_name: str,
+        step: StepTiming,
+        save_seconds: float,
+        total_names: int,
+    ) -> CycleMetrics:
+        """
+        Records a finished scroll cycle.
+
+        Args:
+            list_name (str): Either "followers" or "followings".
+            step (StepTiming): The timings measured by the list extraction.
+            save_seconds (float): Time spent saving the cache after the cycle.
+            total_names (int): The size of the list in the cache after the cycle.
+
+        Returns:
+            CycleMetrics: The recorded cycle.
+        """
+        number = self._cycle_counts.get(list_name, 0) + 1
+        self._cycle_counts[list_name] = number
+
+        cycle = CycleMetrics(
+            list_name=list_name,
+            number=number,
+            settle_seconds=step.settle_seconds,
+            harvest_seconds=step.harvest_seconds,
+            save_seconds=save_seconds,
+            new_names=step.new_names,
+            names_read=step.names_read,
+            total_names=total_names,
+        )
+        self.cycles.append(cycle)
+        return cycle
+
+    def finish(self):
+        """Stops the clock of the run."""
+        self._elapsed = time.perf_counter() - self._start
+
+    @property
+    def names_read(self) -> int:
+        """The number of names read by the run, cached ones included."""
+        return sum(cycle.names_read for cycle in self.cycles)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the run started, or the length of a finished run."""
+        if self._elapsed is not None:
+            return self._elapsed
+        return time.perf_counter() - self._start
+
+    def list_report(self, list_name: str) -> dict:
+        """
+        Summarizes the cycles of one list.
+
+        Args:
+            list_name (str): Either "followers" or "followings".
+
+        Returns:
+            dict: The totals and the distribution of the cycle timings.
+        """
+        cycles = [cycle for cycle in self.cycles if cycle.list_name == list_name]
+        seconds = sum(cycle.seconds for cycle in cycles)
+        new_names = sum(cycle.new_names for cycle in cycles)
+
+        settle = [cycle.settle_seconds for cycle in cycles]
+        head, tail = settle[:SLOWDOWN_WINDOW], settle[-SLOWDOWN_WINDOW:]
+        slowdown = (
+            statistics.fmean(tail) / statistics.fmean(head)
+            if len(settle) >= 2 * SLOWDOWN_WINDOW and statistics.fmean(head)
+            else None
+        )
+
+        return {
+            "cycles": len(cycles),
+            "new_names": new_names,
+            "total_names": cycles[-1].total_names if cycles else 0,
+            "seconds": seconds,
+            "names_per_second": new_names / seconds if seconds else 0.0,
+            "settle_seconds": _summary(settle),
+            "harvest_seconds": _summary([cycle.harvest_seconds for cycle in cycles]),
+            "save_seconds": _summary([cycle.save_seconds for cycle in cycles]),
+            "new_names_per_cycle": _summary([cycle.new_names for cycle in cycles]),
+            # How much longer the last cycles waited than the first ones
+            "settle_slowdown": slowdown,
+        }
+
+    def report(self) -> dict:
+        """
+        Builds the structured report of the run.
+
+        Returns:
+            dict: The phases, a summary of every list and every cycle.
+        """
+        lists = sorted({cycle.list_name for cycle in self.cycles})
+        new_names = sum(cycle.new_names for cycle in self.cycles)
+
+        return {
+            "started_at": self.started_at,
+            "seconds": self.elapsed,
+            "throttled": self.throttled,
+            "new_names": new_names,
+            "names_read": self.names_read,
+            "names_per_second": new_names / self.elapsed if self.elapsed else 0.0,
+            "phases": dict(self.phases),
+            "lists": {list_name: self.list_report(list_name) for list_name in lists},
+            "cycles": [
+                {**cycle._asdict(), "seconds": cycle.seconds} for cycle in self.cycles
+            ],
+        }
+
+    def write_report(self, path: str) -> Path:
+        """
+        Writes the report of the run as JSON.
+
+        Args:
+            path (str): The file to write.
+
+        Returns:
+            Path: The written file.
+        """
+        file = Path(path)
+        atomic_write_text(file, json.dumps(self.report(), indent=2) + "\n")
+        return file
+
+    def prometheus_text(self, account: str) -> str:
+        """
+        Formats the run in the Prometheus text exposition format.
+
+        Args:
+            account (str): The value of the `account` label.
+
+        Returns:
+            str: The metrics.
+        """
+        report = self.report()
+        lines = []
+
+        def gauge(name: str, help_text: str, samples: list[tuple[dict, float]]):
+            lines.append(f"# HELP follower_lens_{name} {help_text}")
+            lines.append(f"# TYPE follower_lens_{name} gauge")
+            for labels, value in samples:
+                labels = {"account": account, **labels}
+                label_text = ",".join(
+                    f'{key}="{value}"' for key, value in labels.items()
+                )
+                lines.append(f"follower_lens_{name}{{{label_text}}} {value}")
+
+        gauge(
+            "last_run_timestamp_seconds",
+            "When the last scrape finished.",
+            [({}, time.time())],
+        )
+        gauge("run_seconds", "Duration of the last scrape.", [({}, report["seconds"])])
+        gauge(
+            "run_throttled",
+            "1 if the last scrape gave up because Instagram kept throttling.",
+            [({}, int(report["throttled"]))],
+        )
+        gauge(
+            "phase_seconds",
+            "Time spent in each phase of the last scrape.",
+            [
+                ({"phase": phase}, seconds)
+                for phase, seconds in report["phases"].items()
+            ],
+        )
+
+        lists = report["lists"].items()
+        gauge(
+            "list_names",
+            "Users in each list after the last scrape.",
+            [({"list": name}, summary["total_names"]) for name, summary in lists],
+        )
+        gauge(
+            "list_cycles",
+            "Scroll cycles of each list in the last scrape.",
+            [({"list": name}, summary["cycles"]) for name, summary in lists],
+        )
+        gauge(
+            "list_names_per_second",
+            "New names read per second of cycle time.",
+            [({"list": name}, summary["names_per_second"]) for name, summary in lists],
+        )
+        for step in ("settle", "harvest", "save"):
+            gauge(
+                f"cycle_{step}_seconds",
+                f"Distribution of the {step} time of the scroll cycles.",
+                [
+                    ({"list": name, "stat": stat}, value)
+                    for name, summary in lists
+                    for stat, value in summary[f"{step}_seconds"].items()
+                ],
+            )
+        gauge(
+            "settle_slowdown_ratio",
+            "Settle time of the last cycles divided by the one of the first cycles.",
+            [
+                ({"list": name}, summary["settle_slowdown"])
+                for name, summary in lists
+                if summary["settle_slowdown"] is not None
+            ],
+        )
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, account: str) -> Path:
+        """
+        Writes the run to a Prometheus textfile. The file is replaced atomically,
+        so the collector never reads a partial file.
+
+        Args:
+            path (str): The file to write, should end with ".prom".
+            account (str): The value of the `account` label.
+
+        Returns:
+            Path: The written file.
+        """
+        file = Path(path)
+        atomic_write_text(file, self.prometheus_text(account))
+        return file
+
+
+def export_run(metrics: ScrapeMetrics, account: str) -> Path:
+    """
+    Writes the report of a finished or throttled run to constants.METRICS_DIR
+    and, if configured, the Prometheus textfile.
+
+    Args:
+        metrics (ScrapeMetrics): The timings of the run.
+        account (str): The encoded username of the account.
+
+    Returns:
+        Path: The JSON report.
+    """
+    metrics.finish()
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    report = metrics.write_report(f"{constants.METRICS_DIR}/{account}-{stamp}.json")
+
+    if constants.PROMETHEUS_TEXTFILE:
+        metrics.write_prometheus(constants.PROMETHEUS_TEXTFILE, account)
+
+    return report
@@ -28,12 +28,28 @@ class Account:
         self.email: Optional[str] = None
         self.password: Optional[str] = None
         self.credentials_path = credentials_path
-        self.key = load_key()
+        self._key: Optional[bytes] = None
 
-    def load_credentials(self) -> bool:
-        """Load credentials from the credentials file."""
+    @property
+    def key(self) -> bytes:
+        """The encryption key of the credentials, loaded or generated on first use."""
+        if self._key is None:
+            self._key = load_key()
+        return self._key
+
+    def load_credentials(self, verbose: bool = True) -> bool:
+        """
+        Load credentials from the credentials file.
+
+        Args:
+            verbose (bool): Whether to print the outcome, scripts turn it off to
+                keep their output clean.
+        """
         if not os.path.exists(self.credentials_path):
-            print(f"Warning: Credentials file does not exist: {self.credentials_path}")
+            if verbose:
+                print(
+                    f"Warning: Credentials file does not exist: {self.credentials_path}"
+                )
             return False
 
         try:
@@ -45,9 +61,11 @@ class Account:
                 self.username = data.get("username")
                 self.email = data.get("email")
                 self.password = data.get("password")
-                print("Info: Credentials loaded successfully.")
+                if verbose:
+                    print("Info: Credentials loaded successfully.")
         except (OSError, json.JSONDecodeError) as e:
-            print(f"Error: Failed to load credentials: {e}")
+            if verbose:
+                print(f"Error: Failed to load credentials: {e}")
             return False
 
         return bool(self.username and self.email and self.password)
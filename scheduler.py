@@ -0,0 +1,183 @@
+"""
+This module paces the browser actions of a scrape and handles Instagram
+throttling. Scrolls and navigations take tokens from a token bucket, so bursts
+stay short and the average rate stays under a limit. When Instagram throttles
+the account mid-scrape, the scrape backs off and retries, and gives up with
+Throttled, leaving the progress saved, only if the throttling persists.
+"""
+
+import asyncio
+import random
+import time
+from typing import Optional
+
+import constants
+
+# Checks if the page shows one of Instagram's throttling messages: in an alert or
+# toast, in a dialog without user rows, or as a whole error page. The profile
+# header and the rows of the followers dialog hold names and bios anyone can
+# write, they are never read.
+THROTTLE_SCRIPT = """() => {
+    const pattern = /Please wait a few minutes|Try again later|Something went wrong/i;
+    const messages = [
+        ...document.querySelectorAll('[role=alert], [role=status]'),
+        ...[...document.querySelectorAll('[role=dialog]')].filter(
+            (dialog) => !dialog.querySelector('a[role=link]')
+        ),
+    ];
+    if (messages.some((element) => pattern.test(element.innerText))) {
+        return true;
+    }
+    if (!document.body || document.querySelector('header, [role=dialog]')) {
+        return false;
+    }
+    return pattern.test(document.body.innerText);
+}"""
+
+
+class Throttled(Exception):
+    """Raised when Instagram keeps throttling the account after every retry."""
+
+
+class TokenBucket:
+    """
+    Allows `rate` actions per second on average and bursts of up to `capacity` actions.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        """Add the tokens earned since the previous call."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Takes tokens from the bucket, going into debt if there are not enough.
+
+        Args:
+            tokens (float): The cost of the action.
+
+        Returns:
+            float: The seconds to wait before the action may run.
+        """
+        self._refill()
+        self.tokens -= tokens
+        return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Waits until the action may run.
+
+        Args:
+            tokens (float): The cost of the action.
+
+        Returns:
+            float: The seconds waited.
+        """
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, tokens: float = 1) -> float:
+        """The asyncio counterpart of acquire, other tasks keep running meanwhile."""
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class RequestScheduler:
+    """
+    Paces the scroll and navigation actions of a scrape and decides how long to
+    back off when Instagram throttles it. Share one scheduler between all lists
+    of an account, so they take turns within the same budget.
+
+    Attributes:
+        bucket (Optional[TokenBucket]): The budget of browser actions, None if
+            actions are not paced.
+        initial_backoff (float): Seconds to wait after the first throttling signal.
+        max_backoff (float): The longest wait between two retries.
+        max_retries (int): How many times to back off before giving up.
+        throttled_seconds (float): The total time spent backing off.
+    """
+
+    def __init__(
+        self,
+        rate=constants.ACTIONS_PER_SECOND,
+        burst=constants.ACTIONS_BURST,
+        initial_backoff=constants.THROTTLE_BACKOFF,
+        max_backoff=constants.THROTTLE_MAX_BACKOFF,
+        max_retries=constants.THROTTLE_RETRIES,
+    ):
+        self.bucket: Optional[TokenBucket] = None
+        if rate:
+            self.bucket = TokenBucket(rate, burst)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.throttled_seconds = 0.0
+
+    def pace(self, tokens: float = 1) -> float:
+        """Waits until the next action may run, see TokenBucket.acquire."""
+        if self.bucket is None:
+            return 0.0
+        return self.bucket.acquire(tokens)
+
+    async def pace_async(self, tokens: float = 1) -> float:
+        """The asyncio counterpart of pace."""
+        if self.bucket is None:
+            return 0.0
+        return await self.bucket.acquire_async(tokens)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Returns how long to wait before a retry, doubling with every attempt.
+        A random jitter keeps accounts of a batch from retrying in lockstep.
+
+        Args:
+            attempt (int): The number of retries done so far.
+
+        Raises:
+            Throttled: If all retries are used up.
+
+        Returns:
+            float: The seconds to wait.
+        """
+        if attempt >= self.max_retries:
+            raise Throttled(
+                f"Instagram is still throttling after {self.max_retries} retries"
+            )
+
+        delay = min(self.max_backoff, self.initial_backoff * 2**attempt)
+        delay *= random.uniform(0.8, 1.2)
+        self.throttled_seconds += delay
+        return delay
+
+    def back_off(self, attempt: int) -> float:
+        """
+        Waits before the next retry, see backoff_delay.
+
+        Args:
+            attempt (int): The number of retries done so far.
+
+        Returns:
+            float: The seconds waited.
+        """
+        delay = self.backoff_delay(attempt)
+        print(f"⏳ Instagram is throttling, retrying in {delay:.0f}s")
+        time.sleep(delay)
+        return delay
+
+    async def back_off_async(self, attempt: int) -> float:
+        """The asyncio counterpart of back_off, other accounts keep going meanwhile."""
+        delay = self.backoff_delay(attempt)
+        print(f"⏳ Instagram is throttling, retrying in {delay:.0f}s")
+        await asyncio.sleep(delay)
+        return delay
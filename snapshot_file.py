@@ -0,0 +1,380 @@
+"""
+This module provides a binary snapshot of the follower cache that is opened with
+mmap instead of being parsed. Both lists are stored sorted and front-coded: every
+name keeps only the bytes that differ from the previous one, and every
+BLOCK_SIZE-th name is stored whole and indexed. Opening a snapshot takes the same
+time whatever the size of the account, membership tests are binary searches over
+the index and iteration decodes names lazily.
+"""
+
+import heapq
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from cache import FollowerCache
+from utils.file_utils import atomic_writer
+
+MAGIC = b"FLSNAP01"
+
+# The lists stored in a snapshot, in file order.
+LIST_NAMES = ("followers", "followings")
+
+# How many names share one index entry, the rest of a block is scanned linearly.
+BLOCK_SIZE = 16
+
+# Follows MAGIC once per list: the number of names, the number of blocks and
+# the offset of the block index.
+TABLE = struct.Struct("<QQQ")
+
+# An entry of a block index: the offset of the block in the file.
+OFFSET = struct.Struct("<Q")
+
+# Name and suffix lengths are stored in one byte, Instagram usernames are at most 30.
+MAX_NAME_BYTES = 255
+
+
+class SortedNames:
+    """
+    The sorted names of one list of a snapshot, decoded from the file on demand.
+
+    A block starts with the length and the bytes of its first name, every other
+    name is stored as the length of the prefix it shares with the previous name,
+    the length of the rest and the rest.
+    """
+
+    def __init__(self, data, count: int, blocks: int, index_offset: int):
+        self.data = data
+        self.count = count
+        self.blocks = blocks
+        self.index_offset = index_offset
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self) -> Iterator[str]:
+        for block in range(self.blocks):
+            for name in self._iter_block(block):
+                yield name.decode()
+
+    def __contains__(self, name: str) -> bool:
+        return self.contains(name)
+
+    def contains(self, name: str) -> bool:
+        """
+        Check if a name is in the list.
+
+        Args:
+            name (str): The username.
+
+        Returns:
+            bool: True if the name is in the list.
+        """
+        key = name.encode()
+
+        # Find the last block whose first name is not greater than the key
+        low, high = 0, self.blocks
+        while low < high:
+            middle = (low + high) // 2
+            if self._first_name(middle) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return False
+
+        for candidate in self._iter_block(low - 1):
+            if candidate >= key:
+                return candidate == key
+        return False
+
+    def _block_offset(self, block: int) -> int:
+        """Return the file offset of a block."""
+        return OFFSET.unpack_from(self.data, self.index_offset + block * OFFSET.size)[0]
+
+    def _first_name(self, block: int) -> bytes:
+        """Return the first name of a block, which is stored whole."""
+        position = self._block_offset(block)
+        size = self.data[position]
+        return self.data[position + 1 : position + 1 + size]
+
+    def _iter_block(self, block: int) -> Iterator[bytes]:
+        """Decode the names of a block."""
+        data = self.data
+        position = self._block_offset(block)
+        size = data[position]
+        name = data[position + 1 : position + 1 + size]
+        position += 1 + size
+        yield name
+
+        last = self.count - block * BLOCK_SIZE
+        for _ in range(1, min(BLOCK_SIZE, last)):
+            shared, size = data[position], data[position + 1]
+            name = name[:shared] + data[position + 2 : position + 2 + size]
+            position += 2 + size
+            yield name
+
+
+# The list of a missing or unreadable snapshot.
+EMPTY = SortedNames(b"", 0, 0, 0)
+
+
+class SnapshotFile:
+    """
+    A memory-mapped snapshot. Only the header is read when it's opened.
+
+    Attributes:
+        lists (dict[str, SortedNames]): The names of every list in LIST_NAMES.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lists = {list_name: EMPTY for list_name in LIST_NAMES}
+        self._file: Optional[BinaryIO] = None
+        self._map: Optional[mmap.mmap] = None
+
+        # An empty file is an empty snapshot, mmap can't map zero bytes
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+
+        self._file = self.path.open("rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if self._map[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"{self.path} is not a follower snapshot")
+
+            for position, list_name in enumerate(LIST_NAMES):
+                count, blocks, index_offset = TABLE.unpack_from(
+                    self._map, len(MAGIC) + position * TABLE.size
+                )
+                if index_offset + blocks * OFFSET.size > len(self._map):
+                    raise ValueError(f"{self.path} is truncated")
+                self.lists[list_name] = SortedNames(
+                    self._map, count, blocks, index_offset
+                )
+        except (ValueError, struct.error) as e:
+            self.close()
+            raise ValueError(f"Cannot read the snapshot {self.path}: {e}") from e
+
+    def close(self):
+        """Unmap and close the file, the lists can't be read afterwards."""
+        self.lists = {list_name: EMPTY for list_name in LIST_NAMES}
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._map = self._file = None
+
+
+def write_snapshot(file: BinaryIO, lists: dict[str, Iterable[str]]):
+    """
+    Writes lists of names as a snapshot, streaming them without holding them in memory.
+
+    Args:
+        file (BinaryIO): A seekable file opened for writing, positioned at its start.
+        lists (dict[str, Iterable[str]]): The names of the lists in LIST_NAMES,
+            each sorted and without duplicates.
+
+    Raises:
+        ValueError: If the names are not sorted and unique or a name is too long.
+    """
+    # The table is filled in once the lists are written
+    file.write(MAGIC)
+    file.write(bytes(TABLE.size * len(LIST_NAMES)))
+    position = file.tell()
+
+    table = []
+    for list_name in LIST_NAMES:
+        offsets = array("Q")
+        chunk = bytearray()
+        previous = b""
+        count = 0
+
+        for name in lists.get(list_name, ()):
+            data = name.encode()
+            if len(data) > MAX_NAME_BYTES:
+                raise ValueError(f"Username is too long for a snapshot: {name}")
+            if count and data <= previous:
+                raise ValueError(f"The {list_name} are not sorted and unique at {name}")
+
+            if count % BLOCK_SIZE == 0:
+                offsets.append(position + len(chunk))
+                chunk.append(len(data))
+                chunk += data
+            else:
+                shared = len(os.path.commonprefix((previous, data)))
+                chunk.append(shared)
+                chunk.append(len(data) - shared)
+                chunk += data[shared:]
+
+            previous = data
+            count += 1
+
+            if len(chunk) >= 1 << 16:
+                file.write(chunk)
+                position += len(chunk)
+                chunk.clear()
+
+        file.write(chunk)
+        position += len(chunk)
+
+        table.append(TABLE.pack(count, len(offsets), position))
+        for offset in offsets:
+            file.write(OFFSET.pack(offset))
+        position += len(offsets) * OFFSET.size
+
+    file.seek(len(MAGIC))
+    file.write(b"".join(table))
+    file.seek(position)
+
+
+class SnapshotBuffer:
+    """
+    A SetBuffer over one list of a snapshot. The snapshot is never loaded, only
+    the names added or removed since it was written are kept in memory.
+    Iterates in username order.
+    """
+
+    def __init__(self, base: SortedNames = EMPTY):
+        self.base = base
+        self.added: set[str] = set()
+        self.removed: set[str] = set()
+        self.changes = []
+
+    def __len__(self):
+        return len(self.base) - len(self.removed) + len(self.added)
+
+    def __iter__(self) -> Iterator[str]:
+        removed = self.removed
+        return heapq.merge(
+            (name for name in self.base if name not in removed), sorted(self.added)
+        )
+
+    def add(self, value):
+        """Add a value to the buffer."""
+        if self.contains(value):
+            return
+
+        if value in self.removed:
+            self.removed.remove(value)
+        else:
+            self.added.add(value)
+        self.changes.append(("+", value))
+
+    def discard(self, value):
+        """Remove a value from the buffer if it is present."""
+        if not self.contains(value):
+            return
+
+        if value in self.added:
+            self.added.remove(value)
+        else:
+            self.removed.add(value)
+        self.changes.append(("-", value))
+
+    def contains(self, key):
+        """Check if a key is in the buffer."""
+        if key in self.added:
+            return True
+        return key not in self.removed and self.base.contains(key)
+
+    def to_list(self):
+        """Get the buffer contents as a list."""
+        return list(self)
+
+    def drain_changes(self):
+        """Return the changes made since the previous call as (op, value) pairs."""
+        changes, self.changes = self.changes, []
+        return changes
+
+    def rebase(self, base: SortedNames):
+        """Continue on top of a new snapshot that already includes every change."""
+        self.base = base
+        self.added = set()
+        self.removed = set()
+
+
+class BinaryFollowerCache(FollowerCache):
+    """
+    A cache that stores followers and followings in a memory-mapped binary snapshot.
+    Every save appends the changed names to a journal, like the journaled
+    FollowerCache does, and a new snapshot is written once the journal grows
+    past `compact_every` entries. It has the same interface as FollowerCache.
+    """
+
+    suffix = ".snapshot"
+    journal_suffix = ".snapshot.journal.jsonl"
+
+    def __init__(self, file_path: str, preload: bool = True, compact_every: int = 5000):
+        self.snapshot: Optional[SnapshotFile] = None
+        super().__init__(
+            file_path, preload=preload, journaled=True, compact_every=compact_every
+        )
+
+    @property
+    def sorted_lists(self) -> bool:
+        """Check if both lists iterate in username order."""
+        return all(isinstance(buffer, SnapshotBuffer) for _, buffer in self._buffers())
+
+    def load_cache(self):
+        """Map the snapshot file, then replay the journal."""
+        self.ensure_file_exists()
+        self.close()
+
+        try:
+            self.snapshot = SnapshotFile(self.file)
+        except ValueError:
+            self.snapshot = None
+
+        lists = self.snapshot.lists if self.snapshot else {}
+        self.followers = SnapshotBuffer(lists.get("followers", EMPTY))
+        self.followings = SnapshotBuffer(lists.get("followings", EMPTY))
+
+        self.replay_journal()
+
+        for _, buffer in self._buffers():
+            buffer.drain_changes()
+
+    def compact(self):
+        """Write the full state to a new snapshot file and drop the journal."""
+        for _, buffer in self._buffers():
+            buffer.drain_changes()
+
+        with atomic_writer(self.file) as file:
+            write_snapshot(
+                file,
+                {
+                    list_name: (
+                        buffer if isinstance(buffer, SnapshotBuffer) else sorted(buffer)
+                    )
+                    for list_name, buffer in self._buffers()
+                },
+            )
+            # The old snapshot is fully read, Windows can't replace a mapped file
+            self.close()
+
+        self.journal.unlink(missing_ok=True)
+        self.journal_size = 0
+
+        # Extractions keep references to the buffers, so they are moved onto
+        # the new snapshot instead of being replaced
+        self.snapshot = SnapshotFile(self.file)
+        for list_name, buffer in self._buffers():
+            if isinstance(buffer, SnapshotBuffer):
+                buffer.rebase(self.snapshot.lists[list_name])
+
+    def clear(self):
+        """Remove all followers and followings from the cache and the disk."""
+        self.followers = SnapshotBuffer()
+        self.followings = SnapshotBuffer()
+        self.compact()
+
+    def close(self):
+        """Unmap the snapshot file."""
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
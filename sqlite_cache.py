@@ -0,0 +1,243 @@
+"""
+This module provides a SQLite storage backend for the follower cache. Every sync
+is recorded as a timestamped snapshot. Membership of a user in a list is stored
+as an interval of snapshots, so unchanged users cost nothing per snapshot and
+loading the current state reads only the open intervals through an index.
+"""
+
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from cache import SetBuffer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usernames (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_at TEXT NOT NULL
+);
+
+-- A user is in a list from `first_snapshot` up to, but not including,
+-- `last_snapshot`. Users currently in the list have no `last_snapshot`.
+CREATE TABLE IF NOT EXISTS memberships (
+    list INTEGER NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES usernames (id),
+    first_snapshot INTEGER NOT NULL REFERENCES snapshots (id),
+    last_snapshot INTEGER REFERENCES snapshots (id),
+    PRIMARY KEY (list, user_id, first_snapshot)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS memberships_current
+    ON memberships (list, user_id) WHERE last_snapshot IS NULL;
+"""
+
+# The ids of the lists in the memberships table.
+LISTS = {"followers": 0, "followings": 1}
+
+
+class SQLiteFollowerCache:
+    """
+    A cache that stores followers and followings with their history in a SQLite database.
+    It has the same interface as cache.FollowerCache.
+    """
+
+    def __init__(self, file_path: str, preload: bool = True):
+        if not file_path.endswith(".sqlite3"):
+            file_path = f"{file_path}.sqlite3"
+
+        self.file = Path(file_path)
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.file)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        self.snapshot_id: Optional[int] = None
+        self.followers = SetBuffer()
+        self.followings = SetBuffer()
+
+        if preload:
+            self.load_cache()
+
+    def begin_snapshot(self) -> int:
+        """
+        Starts a new snapshot, the following saves are recorded in it.
+
+        Returns:
+            int: The id of the new snapshot.
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO snapshots (taken_at) VALUES (?)",
+                (datetime.now(timezone.utc).isoformat(timespec="seconds"),),
+            )
+        self.snapshot_id = cursor.lastrowid
+        return self.snapshot_id
+
+    def save(self):
+        """Record the names added or removed since the previous save in the current snapshot."""
+        changes = [
+            (LISTS[list_name], buffer.drain_changes())
+            for list_name, buffer in self._buffers()
+        ]
+        if not any(list_changes for _, list_changes in changes):
+            return
+
+        if self.snapshot_id is None:
+            self.begin_snapshot()
+
+        with self.connection:
+            for list_id, list_changes in changes:
+                self._apply(list_id, list_changes)
+
+    @staticmethod
+    def _net_changes(changes: list[tuple[str, str]]) -> tuple[list, list]:
+        """
+        Reduces the changes of one list to the net change per name.
+
+        A name's first change tells whether it was in the list before the batch
+        and its last change whether it is in the list afterwards. Names that end
+        up as they started, like "-x, +x" or "+x, -x", don't change at all.
+
+        Args:
+            changes (list[tuple[str, str]]): The (op, name) pairs in drain order.
+
+        Returns:
+            tuple[list, list]: The added and the removed names as 1-tuples.
+        """
+        first, last = {}, {}
+        for op, name in changes:
+            first.setdefault(name, op)
+            last[name] = op
+
+        added = [(name,) for name, op in last.items() if op == first[name] == "+"]
+        removed = [(name,) for name, op in last.items() if op == first[name] == "-"]
+        return added, removed
+
+    def _apply(self, list_id: int, changes: list[tuple[str, str]]):
+        """Write the changes of one list, must run inside a transaction."""
+        added, removed = self._net_changes(changes)
+        snapshot_id = self.snapshot_id
+
+        if added:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO usernames (username) VALUES (?)", added
+            )
+            # A user removed by an earlier save of the same snapshot may still
+            # have its row from this snapshot, re-adding reopens that interval
+            self.connection.executemany(
+                """
+                INSERT INTO memberships (list, user_id, first_snapshot)
+                SELECT ?, id, ? FROM usernames WHERE username = ?
+                ON CONFLICT (list, user_id, first_snapshot) DO UPDATE SET last_snapshot = NULL
+                """,
+                [(list_id, snapshot_id, name) for (name,) in added],
+            )
+
+        if removed:
+            self.connection.executemany(
+                """
+                UPDATE memberships SET last_snapshot = ?
+                WHERE list = ? AND last_snapshot IS NULL
+                    AND user_id = (SELECT id FROM usernames WHERE username = ?)
+                """,
+                [(snapshot_id, list_id, name) for (name,) in removed],
+            )
+            # Users added and removed within the snapshot never were in any snapshot
+            self.connection.execute(
+                "DELETE FROM memberships WHERE list = ? AND first_snapshot = ? AND last_snapshot = ?",
+                (list_id, snapshot_id, snapshot_id),
+            )
+
+    def load_cache(self):
+        """Load the current followers and followings from the database."""
+        self.followers = SetBuffer()
+        self.followings = SetBuffer()
+
+        for list_name, buffer in self._buffers():
+            buffer.storage = set(self.iter_current(list_name))
+
+    def iter_current(self, list_name: str) -> Iterator[str]:
+        """
+        Iterates over the users currently in a list.
+
+        Args:
+            list_name (str): Either "followers" or "followings".
+
+        Returns:
+            Iterator[str]: The usernames.
+        """
+        rows = self.connection.execute(
+            """
+            SELECT usernames.username FROM memberships
+            JOIN usernames ON usernames.id = memberships.user_id
+            WHERE memberships.list = ? AND memberships.last_snapshot IS NULL
+            """,
+            (LISTS[list_name],),
+        )
+        return (username for (username,) in rows)
+
+    def iter_snapshot(self, snapshot_id: int, list_name: str) -> Iterator[str]:
+        """
+        Iterates over the users of a list as of a snapshot, in username order.
+
+        Args:
+            snapshot_id (int): The id of the snapshot.
+            list_name (str): Either "followers" or "followings".
+
+        Returns:
+            Iterator[str]: The sorted usernames.
+        """
+        rows = self.connection.execute(
+            """
+            SELECT usernames.username FROM memberships
+            JOIN usernames ON usernames.id = memberships.user_id
+            WHERE memberships.list = ?
+                AND memberships.first_snapshot <= ?
+                AND (memberships.last_snapshot IS NULL OR memberships.last_snapshot > ?)
+            ORDER BY usernames.username
+            """,
+            (LISTS[list_name], snapshot_id, snapshot_id),
+        )
+        return (username for (username,) in rows)
+
+    def list_snapshots(self) -> list[tuple[int, str]]:
+        """
+        Returns all snapshots, oldest first.
+
+        Returns:
+            list[tuple[int, str]]: The id and the ISO timestamp of every snapshot.
+        """
+        return self.connection.execute(
+            "SELECT id, taken_at FROM snapshots ORDER BY id"
+        ).fetchall()
+
+    def clear(self):
+        """
+        Remove all followers and followings from the current state. The history
+        is kept, clearing is recorded as an empty snapshot.
+        """
+        self.begin_snapshot()
+        with self.connection:
+            self.connection.execute(
+                "UPDATE memberships SET last_snapshot = ? WHERE last_snapshot IS NULL",
+                (self.snapshot_id,),
+            )
+
+        self.followers = SetBuffer()
+        self.followings = SetBuffer()
+        self.snapshot_id = None
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+    def _buffers(self):
+        """Return the (list name, buffer) pairs of the cache."""
+        return [("followers", self.followers), ("followings", self.followings)]
@@ -1,15 +1,22 @@
 """
 This module provides utility functions for encryption and decryption
 using the Fernet symmetric encryption method from the cryptography library.
+The library is imported on first use, so commands that never touch the
+credentials don't pay for loading it.
 """
 
 import os
 
-from cryptography.fernet import Fernet
-
 import constants
 
 
+def _fernet():
+    """Return the Fernet class, importing the cryptography library on first use."""
+    from cryptography.fernet import Fernet
+
+    return Fernet
+
+
 def load_key() -> bytes:
     """Load or generate an encryption key."""
     key_path = constants.ENCRYPTION_KEY_PATH
@@ -18,7 +25,7 @@ def load_key() -> bytes:
         with open(key_path, "rb") as key_file:
             return key_file.read()
     else:
-        key = Fernet.generate_key()
+        key = _fernet().generate_key()
         with open(key_path, "wb") as key_file:
             key_file.write(key)
         return key
@@ -26,11 +33,11 @@ def load_key() -> bytes:
 
 def encrypt(data: str, key: bytes) -> str:
     """Encrypt the given data."""
-    cipher = Fernet(key)
+    cipher = _fernet()(key)
     return cipher.encrypt(data.encode()).decode()
 
 
 def decrypt(data: str, key: bytes) -> str:
     """Decrypt the given data."""
-    cipher = Fernet(key)
+    cipher = _fernet()(key)
     return cipher.decrypt(data.encode()).decode()
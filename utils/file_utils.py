@@ -0,0 +1,53 @@
+"""
+This module provides utility functions for writing files safely.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator
+
+
+@contextmanager
+def atomic_writer(path: Path, mode: str = "wb", **kwargs) -> Iterator[IO]:
+    """
+    Opens a temporary file in the directory of `path` that replaces it once the
+    block exits without an error, so readers never see a partly written file.
+
+    Args:
+        path (Path): The file to write.
+        mode (str): The mode to open the temporary file with.
+        **kwargs: Passed to `open`, e.g. `encoding`.
+
+    Returns:
+        Iterator[IO]: The open temporary file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+
+    try:
+        with os.fdopen(fd, mode, **kwargs) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_text(path: Path, data: str, encoding: str = "utf-8"):
+    """
+    Write text to a file so that readers see either the old or the new contents,
+    never a truncated file, see atomic_writer.
+
+    Args:
+        path (Path): The file to write.
+        data (str): The text to write.
+        encoding (str): The encoding of the text.
+    """
+    with atomic_writer(path, "w", encoding=encoding) as file:
+        file.write(data)